@@ -5,7 +5,15 @@
 а затем сохраняет найденные данные в новый файл.
 '''
 
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# деление файла на диапазоны по строкам - общий с regexp-lutz.py модуль из папки hw-24-11-12-regexp
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hw-24-11-12-regexp'))
+from line_ranges import read_range, split_ranges
 
 # мейлы и телефоны захватываются, если они отграничены как слова (\b)
 # практически все требования rfc для мейлов, tld  на существование не проверяются 
@@ -13,6 +21,7 @@ email_pattern = r"\b[a-zA-Z0-9#\$%&'*+/=?^_`{|}~]+(?:\.[a-zA-Z0-9#\$%&'*+/=?^_`{
 # для рф, 7, 8 или ничего, возможен лидирующий плюс, возможны дефисы, один или два пробела между группами, скобки вокруг первой группы, или вообще без разделяющих знаков
 phone_pattern = r"\b(?:\+7|8)?\s*(?:\(\d{3}\)|\d{3})[\s\-]{0,2}\d{3}[\s\-]{0,2}\d{2}[\s\-]{0,2}\d{2}|\b\d{3}[\s\-]{0,2}\d{3}[\s\-]{0,2}\d{4}\b"
 output_filename = 'output.txt'
+range_size = 64 << 20  # байт в одном диапазоне параллельного поиска
 
 def find_contacts(input_filename, output_filename, email_pattern, phone_pattern):
     # Принимает имена входного и выходного файла, строки regexp для мейла и телефона
@@ -31,5 +40,36 @@ def find_contacts(input_filename, output_filename, email_pattern, phone_pattern)
                 for phone in phones:
                     output_file.write(f"{phone}\n")
 
-input_filename = input('Введите имя входного файла: ')
-find_contacts(input_filename, output_filename, email_pattern, phone_pattern)
+def find_contacts_range(input_filename, start, end, email_pattern, phone_pattern):
+    # Работа одного процесса: читает байты [start, end) через mmap
+    # и ищет по строкам так же, как find_contacts (сначала мейлы строки, потом телефоны).
+    # Переводы строк приводятся к \n, как при чтении файла в текстовом режиме. Возвращает найденное по порядку
+    email_regex = re.compile(email_pattern)
+    phone_regex = re.compile(phone_pattern)
+    text = read_range(input_filename, start, end)
+    found = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        found.extend(email_regex.findall(line))
+        found.extend(phone_regex.findall(line))
+    return found
+
+def find_contacts_parallel(input_filename, output_filename, email_pattern, phone_pattern, workers=None):
+    # То же, что find_contacts, но диапазоны файла по range_size байт просматривают workers процессов.
+    # Результаты записываются в порядке диапазонов, поэтому выходной файл совпадает с find_contacts
+    workers = workers or os.cpu_count() or 1
+    parts = max(workers, -(-os.path.getsize(input_filename) // range_size))
+    ranges = split_ranges(input_filename, parts)
+    with open(output_filename, 'wt', encoding='utf-8') as output_file, ProcessPoolExecutor(workers) as pool:
+        for found in pool.map(find_contacts_range, repeat(input_filename), [start for start, _ in ranges],
+                              [end for _, end in ranges], repeat(email_pattern), repeat(phone_pattern)):
+            output_file.write("".join(f"{contact}\n" for contact in found))
+
+if __name__ == '__main__':
+    input_filename = input('Введите имя входного файла: ')
+    # Для больших файлов: поиск в нескольких процессах, Enter - в одном процессе, как раньше
+    workers = input('Число процессов (Enter - один): ')
+    if workers:
+        find_contacts_parallel(input_filename, output_filename, email_pattern, phone_pattern, int(workers))
+    else:
+        find_contacts(input_filename, output_filename, email_pattern, phone_pattern)
+
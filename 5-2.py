@@ -1,19 +1,246 @@
+import argparse
+import functools
+import io
+import mmap
+import operator
+import os
 import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
 
 class Node:
+    # __slots__ убирает у каждого узла словарь атрибутов __dict__
+    __slots__ = ("value", "left", "right", "parent", "height", "size")
+
     def __init__(self, value, parent=None):
         self.value = value  # Значение узла
         self.left = None  # Ссылка на левого потомка
         self.right = None  # Ссылка на правого потомка
         self.parent = parent  # Ссылка на родительский узел
+        self.height = 1  # Высота поддерева с корнем в узле (нужна для балансировки AVL)
+        self.size = 1  # Количество узлов в поддереве (нужно для rank/select)
+
+
+def _field_property(name):
+    # Свойство ArrayNode, читающее и записывающее ячейку массива storage.<name>
+    def getter(node):
+        return getattr(node.storage, name)[node.index]
+
+    def setter(node, value):
+        getattr(node.storage, name)[node.index] = value
+
+    return property(getter, setter)
+
+
+def _link_property(name):
+    # Свойство ArrayNode для ссылки на другой узел: в массиве хранится индекс, -1 означает None
+    def getter(node):
+        return node.storage.node(getattr(node.storage, name)[node.index])
+
+    def setter(node, other):
+        getattr(node.storage, name)[node.index] = -1 if other is None else other.index
+
+    return property(getter, setter)
+
+
+class ArrayNode:
+    # Легкий указатель на узел внутри ArrayNodeStorage с тем же интерфейсом, что у Node.
+    # Создается при каждом обращении и не хранит ничего, кроме индекса, поэтому узлы сравниваются через ==
+    __slots__ = ("storage", "index")
+
+    def __init__(self, storage, index):
+        self.storage = storage  # Хранилище, в массивах которого лежит узел
+        self.index = index  # Номер ячейки узла в массивах хранилища
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayNode) and self.index == other.index and self.storage is other.storage
+
+    def __hash__(self):
+        return hash(self.index)
+
+    value = _field_property("values")
+    height = _field_property("heights")
+    size = _field_property("sizes")
+    left = _link_property("lefts")
+    right = _link_property("rights")
+    parent = _link_property("parents")
+
+
+class ArrayNodeStorage:
+    # Хранилище узлов в параллельных массивах array вместо отдельного объекта на каждый узел.
+    # Ссылки на потомков и родителя - целые индексы (-1 - нет узла).
+    # Освобожденные ячейки образуют список свободных ячеек, связанный через массив lefts
+    def __init__(self, typecode="q"):
+        self.typecode = typecode  # Тип значений для array ("q" - 64-битные целые), None - произвольные объекты в списке
+        self.clear()
+
+    def clear(self):
+        # Удаляет все узлы
+        self.values = array(self.typecode) if self.typecode else []
+        self.lefts = array("i")  # Индекс левого потомка
+        self.rights = array("i")  # Индекс правого потомка
+        self.parents = array("i")  # Индекс родителя
+        self.heights = array("B")  # Высота поддерева
+        self.sizes = array("i")  # Размер поддерева
+        self.free = -1  # Голова списка свободных ячеек
+
+    def node(self, index):
+        # Узел по индексу, None для -1
+        return ArrayNode(self, index) if index >= 0 else None
+
+    def create(self, value, parent=None):
+        # Создает узел в свободной ячейке или в конце массивов. Значение записывается первым: если array его
+        # не принимает (не целое или вне диапазона typecode), хранилище остается без изменений
+        parent_index = -1 if parent is None else parent.index
+        index = self.free
+        try:
+            if index >= 0:
+                self.values[index] = value
+            else:
+                self.values.append(value)
+        except (TypeError, OverflowError) as error:
+            raise ValueError(f"Значение {value!r} не помещается в array('{self.typecode}')") from error
+        if index >= 0:  # Переиспользуем освобожденную ячейку
+            self.free = self.lefts[index]
+            self.lefts[index] = -1
+            self.rights[index] = -1
+            self.parents[index] = parent_index
+            self.heights[index] = 1
+            self.sizes[index] = 1
+        else:
+            index = len(self.lefts)
+            self.lefts.append(-1)
+            self.rights.append(-1)
+            self.parents.append(parent_index)
+            self.heights.append(1)
+            self.sizes.append(1)
+        return ArrayNode(self, index)
+
+    def release(self, node):
+        # Возвращает ячейку удаленного узла в список свободных
+        self.lefts[node.index] = self.free
+        self.rights[node.index] = -1
+        self.parents[node.index] = -1
+        self.free = node.index
+
 
 class BinarySearchTree:
-    def __init__(self):
+    def __init__(self, balanced=False, storage=None):
         self.root = None  # Корневой узел
+        self.balanced = balanced  # Если True, дерево балансируется по правилам AVL после insert/delete
+        self.storage = storage  # Хранилище узлов (например, ArrayNodeStorage), None - отдельные объекты Node
+
+    @classmethod
+    def from_iterable(cls, values, balanced=False, storage=None):
+        # Создает дерево из произвольного набора значений: одна сортировка и построение
+        # идеально сбалансированного дерева за O(n) (для уже отсортированного входа sorted тоже O(n))
+        bst = cls(balanced, storage)
+        bst._build(sorted(values))
+        return bst
 
     def _create_node(self, value, parent=None):
         # Создает и возвращает новый узел
+        if self.storage is not None:
+            return self.storage.create(value, parent)
         return Node(value, parent)
+
+    def _release_node(self, node):
+        # Освобождает место, занятое удаленным из дерева узлом
+        if self.storage is not None:
+            self.storage.release(node)
+
+    def _build(self, values):
+        # Заменяет содержимое дерева идеально сбалансированным деревом из отсортированного списка values.
+        # Середина каждого отрезка становится корнем поддерева, глубина рекурсии - O(log n)
+        def build(lo, hi, parent):
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            node = self._create_node(values[mid], parent)
+            node.left = build(lo, mid, node)
+            node.right = build(mid + 1, hi, node)
+            node.size = hi - lo
+            node.height = (hi - lo).bit_length()  # Высота идеально сбалансированного поддерева
+            return node
+
+        if self.storage is not None:
+            self.storage.clear()  # Старые узлы больше не нужны
+        self.root = build(0, len(values), None)
+
+    def _height(self, node):
+        # Высота поддерева, для пустого поддерева 0
+        return node.height if node else 0
+
+    def _size(self, node):
+        # Количество узлов в поддереве, для пустого поддерева 0
+        return node.size if node else 0
+
+    def _update(self, node):
+        # Пересчитывает высоту и размер поддерева узла по его потомкам
+        node.height = 1 + max(self._height(node.left), self._height(node.right))
+        node.size = 1 + self._size(node.left) + self._size(node.right)
+
+    def _replace_child(self, parent, old, new):
+        # Заменяет у parent ссылку на потомка old ссылкой на new (parent=None означает корень)
+        if parent is None:
+            self.root = new
+        elif old == parent.left:
+            parent.left = new
+        else:
+            parent.right = new
+
+    def _rotate_left(self, node):
+        # Левый поворот вокруг node, возвращает новый корень поддерева
+        pivot = node.right
+        node.right = pivot.left
+        if pivot.left:
+            pivot.left.parent = node
+        pivot.parent = node.parent
+        self._replace_child(node.parent, node, pivot)
+        pivot.left = node
+        node.parent = pivot
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rotate_right(self, node):
+        # Правый поворот вокруг node, возвращает новый корень поддерева
+        pivot = node.left
+        node.left = pivot.right
+        if pivot.right:
+            pivot.right.parent = node
+        pivot.parent = node.parent
+        self._replace_child(node.parent, node, pivot)
+        pivot.right = node
+        node.parent = pivot
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rebalance(self, node):
+        # Поднимается от node к корню, пересчитывает высоты и размеры поддеревьев и выполняет повороты AVL,
+        # если высоты поддеревьев различаются больше чем на 1
+        while node:
+            self._update(node)
+            balance = self._height(node.left) - self._height(node.right)
+            if balance > 1:  # Перевес слева
+                if self._height(node.left.left) < self._height(node.left.right):
+                    self._rotate_left(node.left)  # Случай левый-правый сводим к левому-левому
+                node = self._rotate_right(node)
+            elif balance < -1:  # Перевес справа
+                if self._height(node.right.right) < self._height(node.right.left):
+                    self._rotate_right(node.right)  # Случай правый-левый сводим к правому-правому
+                node = self._rotate_left(node)
+            node = node.parent
+
     def _merge_subtrees(self, node):
         # удаляет узел node и склеивает оставшиеся ветки дерева
         if node.left is None and node.right is None:  # Если у узла нет потомков
@@ -49,6 +276,16 @@ class BinarySearchTree:
             successor = self._find_min(node.right)  # Ищем минимальный элемент в правом поддереве
             node.value = successor.value  # Замещаем удаляемый узел минимальным
             self._merge_subtrees(successor)  # Удаляем преемника
+            return
+
+        if self.balanced:
+            self._rebalance(node.parent)  # Восстанавливаем баланс от родителя удаленного узла
+        else:
+            parent = node.parent
+            while parent:  # Уменьшаем размеры поддеревьев на пути к корню
+                parent.size -= 1
+                parent = parent.parent
+        self._release_node(node)
 
     def _find_min(self, node):
         # Возвращает узел с минимальным значением в дереве, считая от узла node
@@ -77,20 +314,54 @@ class BinarySearchTree:
                     current = current.left  # Идем влево
                 else:
                     current = current.right  # Идем вправо
+            node = self._create_node(value, parent)  # Если хранилище не примет значение, дерево не изменится
             if value < parent.value:
-                parent.left = self._create_node(value, parent)  # Создаем левого потомка
+                parent.left = node  # Новый узел - левый потомок
             else:
-                parent.right = self._create_node(value, parent)  # Создаем правого потомка
+                parent.right = node  # Новый узел - правый потомок
+            while parent:  # Новый узел попал в поддеревья всех узлов на пути к корню
+                parent.size += 1
+                parent = parent.parent
+            if self.balanced:
+                self._rebalance(parent)  # Восстанавливаем баланс на пути к корню
+
+    def _delete_value(self, value):
+        # Удаляет одно вхождение value без вывода сообщений, возвращает True, если элемент был в дереве
+        node = self.search(value)
+        if node is None:
+            return False
+        self._merge_subtrees(node)  # Удаляем найденный элемент
+        return True
 
     def delete(self, value):
         # удаляет элемент, вызывая функцию _merge_subtrees 
-        node = self.search(value)
-        if node:
-            self._merge_subtrees(node)  # Удаляем найденный элемент
+        if self._delete_value(value):
             print(f"Элемент {value} удален.")  
         else:
             print(f"Значение {value} не найдено в дереве.")  
 
+    def delete_many(self, values):
+        # Удаляет по одному вхождению каждого значения из values, возвращает количество удаленных элементов.
+        # Небольшой пакет удаляется поштучно за O(m log n); большой - одним слиянием отсортированного
+        # пакета с обходом дерева и перестройкой дерева за O(n + m log m)
+        values = sorted(values)
+        if not values or self.root is None:
+            return 0
+        if len(values) * len(self).bit_length() < len(self):
+            return sum(self._delete_value(value) for value in values)
+
+        kept, i, removed = [], 0, 0
+        for value in self:
+            while i < len(values) and values[i] < value:
+                i += 1  # Значения, которых нет в дереве, пропускаем
+            if i < len(values) and values[i] == value:
+                i += 1
+                removed += 1
+            else:
+                kept.append(value)
+        self._build(kept)
+        return removed
+
     def search(self, value):
         # Поиск элемента в дереве
         current = self.root
@@ -103,29 +374,899 @@ class BinarySearchTree:
                 current = current.right  # Идем вправо
         return None  # Возвращаем None, если элемент не найден
 
+    def search_many(self, values):
+        # Пакетный поиск: запросы сортируются и проходят дерево одним совместным спуском.
+        # В узле отсортированный отрезок запросов делится бинарным поиском на меньшие, равные и большие
+        # значения узла, меньшие уходят влево, большие вправо, поэтому каждый узел посещается не больше
+        # одного раза, а общие верхние уровни дерева проходятся один раз на весь пакет.
+        # Возвращает маску принадлежности - список bool в порядке values
+        values = list(values)
+        order = sorted(range(len(values)), key=values.__getitem__)
+        probes = [values[i] for i in order]
+        found = [False] * len(values)
+        stack = [(self.root, 0, len(probes))] if self.root and probes else []
+        while stack:
+            node, lo, hi = stack.pop()
+            if hi - lo == 1:  # Остался один запрос - обычный спуск без деления отрезка
+                value = probes[lo]
+                while node:
+                    if value == node.value:
+                        found[order[lo]] = True
+                        break
+                    node = node.left if value < node.value else node.right
+                continue
+            less = bisect_left(probes, node.value, lo, hi)  # probes[lo:less] меньше значения узла
+            greater = bisect_right(probes, node.value, less, hi)  # probes[greater:hi] больше
+            for i in range(less, greater):
+                found[order[i]] = True
+            if lo < less and node.left:
+                stack.append((node.left, lo, less))
+            if greater < hi and node.right:
+                stack.append((node.right, greater, hi))
+        return found
+
+    def height(self):
+        # Высота дерева. В сбалансированном дереве хранится в корне,
+        # иначе считается обходом по уровням без рекурсии
+        if self.balanced:
+            return self._height(self.root)
+        height = 0
+        level = [self.root] if self.root else []
+        while level:
+            height += 1
+            level = [child for node in level for child in (node.left, node.right) if child]
+        return height
+
+    def __len__(self):
+        # Количество элементов в дереве
+        return self._size(self.root)
+
+    def _successor(self, node):
+        # Следующий по порядку узел, находится по ссылкам на родителя без стека
+        if node.right:
+            return self._find_min(node.right)
+        while node.parent and node == node.parent.right:
+            node = node.parent
+        return node.parent
+
+    def _lower_bound(self, value):
+        # Первый по порядку узел со значением не меньше value
+        current, result = self.root, None
+        while current:
+            if current.value < value:
+                current = current.right
+            else:
+                result = current  # Кандидат, ищем левее
+                current = current.left
+        return result
+
+    def __iter__(self):
+        # Ленивый симметричный обход: без рекурсии и стека, O(1) дополнительной памяти.
+        # Изменять дерево во время обхода нельзя
+        return self.items()
+
+    def items(self, lo=None, hi=None):
+        # Ленивый обход значений из диапазона lo <= value <= hi (None - без ограничения)
+        if self.root is None:
+            return
+        node = self._find_min(self.root) if lo is None else self._lower_bound(lo)
+        while node and (hi is None or not hi < node.value):
+            yield node.value
+            node = self._successor(node)
+
+    def rank(self, value):
+        # Количество элементов дерева, строго меньших value
+        rank, current = 0, self.root
+        while current:
+            if current.value < value:
+                rank += self._size(current.left) + 1  # Левое поддерево и сам узел меньше value
+                current = current.right
+            else:
+                current = current.left
+        return rank
+
+    def select(self, k):
+        # Возвращает k-й по порядку элемент (нумерация с 0)
+        if not 0 <= k < len(self):
+            raise IndexError("Индекс вне дерева")
+        current = self.root
+        while True:
+            left_size = self._size(current.left)
+            if k < left_size:
+                current = current.left
+            elif k == left_size:
+                return current.value
+            else:
+                k -= left_size + 1
+                current = current.right
+
+    def kth_smallest(self, k):
+        # k-й наименьший элемент (нумерация с 1)
+        return self.select(k - 1)
+
     def _inorder_traversal(self, node, result):
-        # Симметричный обход дерева
+        # Симметричный обход поддерева node без рекурсии
         if node:
-            self._inorder_traversal(node.left, result)
-            result.append(node.value)
-            self._inorder_traversal(node.right, result)
+            last = self._find_max(node)
+            current = self._find_min(node)
+            while True:
+                result.append(current.value)
+                if current == last:
+                    break
+                current = self._successor(current)
 
     def print_tree(self):
-        # Печать дерева в виде отсортированного списка
-        result = []
-        self._inorder_traversal(self.root, result)
-        print("Tree:", result)  # Вывод отсортированного дерева
+        # Печать дерева в виде отсортированного списка, значения выводятся по мере обхода без копирования
+        print("Tree: [", end="")
+        for i, value in enumerate(self):
+            print(", " if i else "", repr(value), sep="", end="")
+        print("]")  # Вывод отсортированного дерева
         print(f"Root: {self.root.value}" if self.root else "root = None")
 
 
-class CLI:
+class ReadWriteLock:
+    # Блокировка читателей-писателей: читатели не блокируют друг друга, писатели работают по одному.
+    # Ожидающий писатель не пропускает новых читателей, чтобы писатели не голодали.
+    # Повторный захват тем же потоком разрешен (внутренние методы дерева вызывают публичные),
+    # повышение блокировки чтения до записи - нет
     def __init__(self):
-        self.bst = BinarySearchTree()  # Создаем бинарное дерево
+        self._condition = threading.Condition()
+        self._readers = 0  # Количество потоков, держащих блокировку на чтение
+        self._writers_waiting = 0  # Количество ожидающих писателей
+        self._writer = None  # Идентификатор потока-писателя
+        self._write_depth = 0  # Глубина повторного входа писателя
+        self._local = threading.local()  # Глубина повторного входа читателя в своем потоке
+
+    def acquire_read(self):
+        if self._writer == threading.get_ident():  # Писатель читает внутри своей операции
+            self._write_depth += 1
+            return
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            with self._condition:
+                while self._writer is not None or self._writers_waiting:
+                    self._condition.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+
+    def release_read(self):
+        if self._writer == threading.get_ident():
+            self._write_depth -= 1
+            return
+        self._local.depth -= 1
+        if not self._local.depth:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()  # Будим ожидающего писателя
+
+    def acquire_write(self):
+        if self._writer == threading.get_ident():
+            self._write_depth += 1
+            return
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = threading.get_ident()
+            self._write_depth = 1
+
+    def release_write(self):
+        self._write_depth -= 1
+        if not self._write_depth:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _reading(method):
+    # Выполняет метод дерева под блокировкой на чтение
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.reading():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writing(method):
+    # Выполняет метод дерева под блокировкой на запись
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.writing():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ConcurrentBinarySearchTree(BinarySearchTree):
+    # Дерево для общего использования из нескольких потоков: поиски выполняются параллельно,
+    # insert/delete - по одному и не пересекаются с поисками, поэтому читатели не видят
+    # дерево посреди перестановки ссылок в _merge_subtrees или поворотах
+    def __init__(self, balanced=False, storage=None):
+        super().__init__(balanced, storage)
+        self.lock = ReadWriteLock()
+
+    search = _reading(BinarySearchTree.search)
+    search_many = _reading(BinarySearchTree.search_many)
+    height = _reading(BinarySearchTree.height)
+    __len__ = _reading(BinarySearchTree.__len__)
+    rank = _reading(BinarySearchTree.rank)
+    select = _reading(BinarySearchTree.select)
+    print_tree = _reading(BinarySearchTree.print_tree)
+
+    insert = _writing(BinarySearchTree.insert)
+    _delete_value = _writing(BinarySearchTree._delete_value)
+    delete_many = _writing(BinarySearchTree.delete_many)
+
+    def items(self, lo=None, hi=None):
+        # Ленивый обход нельзя держать открытым между операциями писателей,
+        # поэтому диапазон копируется под блокировкой
+        with self.lock.reading():
+            return iter(list(BinarySearchTree.items(self, lo, hi)))
+
+
+# Формат файла DiskBTree: страницы по PAGE_SIZE байт, страница 0 - заголовок,
+# остальные - узлы B-дерева или свободные страницы
+PAGE_SIZE = 4096
+BTREE_MAGIC = b"BTREE052"
+BTREE_META = struct.Struct("<8sIIIQ")  # Сигнатура, корневая страница, число страниц, первая свободная страница, число ключей
+BTREE_HEADER = struct.Struct("<BxH")  # Признак листа, число ключей в узле
+BTREE_KEY_MIN, BTREE_KEY_MAX = -(1 << 63), (1 << 63) - 1  # Ключи хранятся как int64
+BTREE_MAX_KEYS = 255  # Ключи int64, счетчики uint32 и ссылки на потомков uint32 помещаются в одну страницу
+BTREE_MIN_DEGREE = (BTREE_MAX_KEYS + 1) // 2  # Минимальная степень t: в узле от t-1 до 2t-1 ключей
+BTREE_KEYS_OFFSET = BTREE_HEADER.size
+BTREE_COUNTS_OFFSET = BTREE_KEYS_OFFSET + 8 * BTREE_MAX_KEYS
+BTREE_CHILDREN_OFFSET = BTREE_COUNTS_OFFSET + 4 * BTREE_MAX_KEYS
+
+
+class BTreeNode:
+    # Разобранная страница B-дерева. Одинаковые ключи хранятся один раз со счетчиком вхождений
+    __slots__ = ("page", "leaf", "keys", "counts", "children")
+
+    def __init__(self, page, leaf, keys=None, counts=None, children=None):
+        self.page = page  # Номер страницы в файле
+        self.leaf = leaf  # Лист или внутренний узел
+        self.keys = keys or []  # Отсортированные ключи
+        self.counts = counts or []  # Количество вхождений каждого ключа
+        self.children = children or []  # Номера страниц потомков (на один больше, чем ключей)
+
+
+class DiskBTree:
+    # B-дерево, хранящееся в файле: узел занимает одну страницу, файл отображается в память через mmap.
+    # Интерфейс insert/search/delete/items совпадает с BinarySearchTree (ключи - целые int64).
+    # При открытии существующего файла читается только заголовок, страницы читаются по мере обращения,
+    # а разобранные узлы держатся в ограниченном кэше cache_pages (вытесняется давно неиспользованный).
+    # Изменения записываются в отображенную память сразу (write-through), flush/close сбрасывают ее на диск.
+    # Журнала нет, поэтому аварийное завершение посреди операции может повредить файл
+    balanced = True  # B-дерево всегда сбалансировано
+
+    def __init__(self, path, cache_pages=1024):
+        self.path = path
+        self.cache_pages = cache_pages  # Максимальное число разобранных узлов в памяти
+        self._cache = OrderedDict()  # Номер страницы -> BTreeNode, в порядке последнего обращения
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(2 * PAGE_SIZE)  # Заголовок и пустой корневой лист
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        if exists:
+            magic, self.root_page, self.page_count, self.free_page, self.count = BTREE_META.unpack_from(self._mm, 0)
+            if magic != BTREE_MAGIC:
+                self.close()
+                raise ValueError(f"Файл {path} не является файлом DiskBTree")
+        else:
+            self.root_page, self.page_count, self.free_page, self.count = 1, 2, 0, 0
+            self._write(BTreeNode(1, True))
+            self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        # Сбрасывает отображенные страницы на диск
+        self._write_meta()
+        self._mm.flush()
+
+    def close(self):
+        # Сохраняет дерево и закрывает файл
+        if not self._mm.closed:
+            self.flush()
+            self._mm.close()
+            self._file.close()
+        self._cache.clear()
+
+    def _write_meta(self):
+        BTREE_META.pack_into(self._mm, 0, BTREE_MAGIC, self.root_page, self.page_count, self.free_page, self.count)
+
+    def _node(self, page):
+        # Узел по номеру страницы: из кэша или разбором страницы из mmap
+        node = self._cache.get(page)
+        if node is not None:
+            self._cache.move_to_end(page)
+            return node
+        offset = page * PAGE_SIZE
+        leaf, n = BTREE_HEADER.unpack_from(self._mm, offset)
+        node = BTreeNode(
+            page, bool(leaf),
+            list(struct.unpack_from(f"<{n}q", self._mm, offset + BTREE_KEYS_OFFSET)),
+            list(struct.unpack_from(f"<{n}I", self._mm, offset + BTREE_COUNTS_OFFSET)),
+            [] if leaf else list(struct.unpack_from(f"<{n + 1}I", self._mm, offset + BTREE_CHILDREN_OFFSET)),
+        )
+        self._cache[page] = node
+        self._evict()
+        return node
+
+    def _evict(self):
+        # Вытесняет давно неиспользованные узлы, пока их не больше cache_pages. Каждый измененный узел
+        # записывается в mmap до следующего обращения к другим страницам, поэтому вытесненное не теряется
+        while len(self._cache) > self.cache_pages:
+            self._cache.popitem(last=False)
+
+    def _write(self, node):
+        # Записывает узел в его страницу
+        offset = node.page * PAGE_SIZE
+        n = len(node.keys)
+        BTREE_HEADER.pack_into(self._mm, offset, node.leaf, n)
+        struct.pack_into(f"<{n}q", self._mm, offset + BTREE_KEYS_OFFSET, *node.keys)
+        struct.pack_into(f"<{n}I", self._mm, offset + BTREE_COUNTS_OFFSET, *node.counts)
+        if not node.leaf:
+            struct.pack_into(f"<{n + 1}I", self._mm, offset + BTREE_CHILDREN_OFFSET, *node.children)
+
+    def _allocate(self, leaf):
+        # Новый пустой узел на свободной странице или в конце файла
+        if self.free_page:
+            page = self.free_page
+            self.free_page = struct.unpack_from("<I", self._mm, page * PAGE_SIZE)[0]
+        else:
+            page = self.page_count
+            self.page_count += 1
+            if self.page_count * PAGE_SIZE > len(self._mm):  # Увеличиваем файл вдвое и отображаем заново
+                new_size = len(self._mm) * 2
+                self._mm.close()
+                self._file.truncate(new_size)
+                self._mm = mmap.mmap(self._file.fileno(), 0)
+        node = BTreeNode(page, leaf)
+        self._cache[page] = node
+        self._evict()
+        return node
+
+    def _free(self, node):
+        # Возвращает страницу узла в список свободных страниц
+        struct.pack_into("<I", self._mm, node.page * PAGE_SIZE, self.free_page)
+        self.free_page = node.page
+        self._cache.pop(node.page, None)
+
+    def _split_child(self, parent, i, child):
+        # Делит заполненного потомка child (parent.children[i]) пополам, средний ключ поднимается в parent
+        t = BTREE_MIN_DEGREE
+        sibling = self._allocate(child.leaf)
+        sibling.keys, child_keys = child.keys[t:], child.keys[:t - 1]
+        sibling.counts, child_counts = child.counts[t:], child.counts[:t - 1]
+        if not child.leaf:
+            sibling.children, child.children = child.children[t:], child.children[:t]
+        parent.keys.insert(i, child.keys[t - 1])
+        parent.counts.insert(i, child.counts[t - 1])
+        parent.children.insert(i + 1, sibling.page)
+        child.keys, child.counts = child_keys, child_counts
+        self._write(child)
+        self._write(sibling)
+        self._write(parent)
+
+    def insert(self, value):
+        # Добавляет ключ: спуск от корня с упреждающим делением заполненных узлов.
+        # Тип и диапазон проверяются до любых изменений, иначе struct.pack в _write упал бы, когда ключ уже
+        # вставлен в узел из кэша, и кэш разошелся бы с файлом
+        try:
+            value = operator.index(value)  # Только целые: 2.5 или "5" не принимаются
+        except TypeError:
+            raise ValueError(f"Ключ {value!r} не целое число") from None
+        if not BTREE_KEY_MIN <= value <= BTREE_KEY_MAX:
+            raise ValueError(f"Ключ {value} вне диапазона int64")
+        root = self._node(self.root_page)
+        if len(root.keys) == BTREE_MAX_KEYS:  # Корень заполнен - дерево растет вверх
+            new_root = self._allocate(False)
+            new_root.children = [root.page]
+            self._split_child(new_root, 0, root)
+            self.root_page = new_root.page
+            root = new_root
+        node = root
+        while True:
+            i = bisect_left(node.keys, value)
+            if i < len(node.keys) and node.keys[i] == value:
+                node.counts[i] += 1  # Ключ уже есть - увеличиваем счетчик
+                break
+            if node.leaf:
+                node.keys.insert(i, value)
+                node.counts.insert(i, 1)
+                break
+            child = self._node(node.children[i])
+            if len(child.keys) == BTREE_MAX_KEYS:
+                self._split_child(node, i, child)
+                if value == node.keys[i]:
+                    node.counts[i] += 1
+                    break
+                if value > node.keys[i]:
+                    i += 1
+                child = self._node(node.children[i])
+            node = child
+        self._write(node)
+        self.count += 1
+        self._write_meta()
+
+    def search(self, value):
+        # Поиск ключа, возвращает ключ или None
+        node = self._node(self.root_page)
+        while True:
+            i = bisect_left(node.keys, value)
+            if i < len(node.keys) and node.keys[i] == value:
+                return value
+            if node.leaf:
+                return None
+            node = self._node(node.children[i])
+
+    def search_many(self, values):
+        # Пакетный поиск одним совместным спуском, как BinarySearchTree.search_many:
+        # отсортированные запросы делятся между потомками узла по его ключам,
+        # поэтому каждая страница читается не больше одного раза. Возвращает список bool в порядке values
+        values = list(values)
+        order = sorted(range(len(values)), key=values.__getitem__)
+        probes = [values[i] for i in order]
+        found = [False] * len(values)
+        stack = [(self.root_page, 0, len(probes))] if probes else []
+        while stack:
+            page, lo, hi = stack.pop()
+            node = self._node(page)
+            i = lo
+            while i < hi:
+                j = bisect_left(node.keys, probes[i])  # Первый ключ узла не меньше очередного запроса
+                if j < len(node.keys) and node.keys[j] == probes[i]:
+                    end = bisect_right(probes, probes[i], i, hi)
+                    for k in range(i, end):
+                        found[order[k]] = True
+                else:
+                    end = hi if j == len(node.keys) else bisect_left(probes, node.keys[j], i, hi)
+                    if not node.leaf:
+                        stack.append((node.children[j], i, end))  # Запросы между keys[j - 1] и keys[j]
+                i = end
+        return found
+
+    def _delete_value(self, value):
+        # Удаляет одно вхождение ключа без вывода сообщений, возвращает True, если ключ был в дереве
+        if self.search(value) is None:
+            return False
+        self.count -= 1
+        node = self._node(self.root_page)
+        key = value
+        while True:
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                if key == value and node.counts[i] > 1:  # Остаются другие вхождения
+                    node.counts[i] -= 1
+                    self._write(node)
+                    break
+                if node.leaf:
+                    del node.keys[i], node.counts[i]
+                    self._write(node)
+                    break
+                left, right = self._node(node.children[i]), self._node(node.children[i + 1])
+                if len(left.keys) >= BTREE_MIN_DEGREE:  # Замещаем ключ предшественником и удаляем его слева
+                    last = self._max_node(left)
+                    key = node.keys[i] = last.keys[-1]
+                    node.counts[i] = last.counts[-1]
+                    self._write(node)
+                    node = left
+                elif len(right.keys) >= BTREE_MIN_DEGREE:  # Замещаем ключ преемником и удаляем его справа
+                    first = self._min_node(right)
+                    key = node.keys[i] = first.keys[0]
+                    node.counts[i] = first.counts[0]
+                    self._write(node)
+                    node = right
+                else:  # Оба соседа минимальны - сливаем их вместе с ключом
+                    node = self._merge_children(node, i)
+                continue
+            # Ключа в узле нет: перед спуском добиваемся, чтобы в потомке было не меньше t ключей
+            child = self._node(node.children[i])
+            if len(child.keys) < BTREE_MIN_DEGREE:
+                child = self._fill_child(node, i, child)
+            node = child
+
+        root = self._node(self.root_page)
+        if not root.keys and not root.leaf:  # Корень опустел - дерево становится ниже
+            self.root_page = root.children[0]
+            self._free(root)
+        self._write_meta()
+        return True
+
+    def _min_node(self, node):
+        # Самый левый лист поддерева
+        while not node.leaf:
+            node = self._node(node.children[0])
+        return node
+
+    def _max_node(self, node):
+        # Самый правый лист поддерева
+        while not node.leaf:
+            node = self._node(node.children[-1])
+        return node
+
+    def _merge_children(self, parent, i):
+        # Сливает parent.children[i], ключ parent.keys[i] и parent.children[i + 1] в один узел
+        left, right = self._node(parent.children[i]), self._node(parent.children[i + 1])
+        left.keys += [parent.keys.pop(i)] + right.keys
+        left.counts += [parent.counts.pop(i)] + right.counts
+        left.children += right.children
+        del parent.children[i + 1]
+        self._free(right)
+        self._write(left)
+        self._write(parent)
+        return left
+
+    def _fill_child(self, parent, i, child):
+        # Добавляет в потомка с t-1 ключами ключ от соседа или сливает его с соседом, возвращает узел для спуска
+        if i > 0:
+            left = self._node(parent.children[i - 1])
+            if len(left.keys) >= BTREE_MIN_DEGREE:  # Перенос через родителя от левого соседа
+                child.keys.insert(0, parent.keys[i - 1])
+                child.counts.insert(0, parent.counts[i - 1])
+                parent.keys[i - 1], parent.counts[i - 1] = left.keys.pop(), left.counts.pop()
+                if not child.leaf:
+                    child.children.insert(0, left.children.pop())
+                self._write(left)
+                self._write(child)
+                self._write(parent)
+                return child
+        if i < len(parent.keys):
+            right = self._node(parent.children[i + 1])
+            if len(right.keys) >= BTREE_MIN_DEGREE:  # Перенос через родителя от правого соседа
+                child.keys.append(parent.keys[i])
+                child.counts.append(parent.counts[i])
+                parent.keys[i], parent.counts[i] = right.keys.pop(0), right.counts.pop(0)
+                if not child.leaf:
+                    child.children.append(right.children.pop(0))
+                self._write(right)
+                self._write(child)
+                self._write(parent)
+                return child
+            return self._merge_children(parent, i)
+        return self._merge_children(parent, i - 1)
+
+    def delete(self, value):
+        # Удаляет ключ из дерева
+        if self._delete_value(value):
+            print(f"Элемент {value} удален.")
+        else:
+            print(f"Значение {value} не найдено в дереве.")
+
+    def __len__(self):
+        # Количество ключей с учетом повторов
+        return self.count
+
+    def height(self):
+        # Высота дерева в узлах (все листья на одной глубине)
+        height, node = 1, self._node(self.root_page)
+        while not node.leaf:
+            height += 1
+            node = self._node(node.children[0])
+        return height
+
+    def __iter__(self):
+        return self.items()
+
+    def items(self, lo=None, hi=None):
+        # Ленивый обход ключей из диапазона lo <= key <= hi. Стек хранит номера страниц и позиции,
+        # а не узлы, поэтому кэш может вытеснять пройденные страницы. Изменять дерево во время обхода нельзя
+        stack = []
+        page = self.root_page
+        while True:  # Спуск к первому ключу не меньше lo
+            node = self._node(page)
+            i = 0 if lo is None else bisect_left(node.keys, lo)
+            stack.append((page, i))
+            if node.leaf:
+                break
+            page = node.children[i]
+        while stack:
+            page, i = stack.pop()
+            node = self._node(page)
+            if i >= len(node.keys):
+                continue
+            key = node.keys[i]
+            if hi is not None and key > hi:
+                return
+            for _ in range(node.counts[i]):
+                yield key
+            stack.append((page, i + 1))
+            if not node.leaf:  # Следующие ключи - в самом левом пути поддерева children[i + 1]
+                page = node.children[i + 1]
+                while True:
+                    stack.append((page, 0))
+                    node = self._node(page)
+                    if node.leaf:
+                        break
+                    page = node.children[0]
+
+    def print_tree(self):
+        # Печать дерева в виде отсортированного списка по мере обхода
+        print("Tree: [", end="")
+        for i, value in enumerate(self):
+            print(", " if i else "", repr(value), sep="", end="")
+        print("]")
+        print(f"Root: {self._node(self.root_page).keys}")
+
+
+def benchmark_insert_orders(n=10**6, degenerate_limit=5000, probes=10**4):
+    # Сравнение вставки отсортированных и случайных ключей в обычное и AVL-дерево.
+    # Обычное дерево на отсортированных ключах вырождается в список и вставка n ключей
+    # занимает O(n^2), поэтому в этом случае размер ограничивается degenerate_limit
+    keys_sorted = list(range(n))
+    keys_random = random.sample(keys_sorted, n)
+    print(f"{'дерево':>8} {'порядок':>8} {'ключей':>9} {'вставка, с':>11} {'мкс/вставка':>12} {'высота':>7} {'мкс/поиск':>10}")
+    for balanced in (False, True):
+        for order, keys in (("sorted", keys_sorted), ("random", keys_random)):
+            size = n if balanced or order == "random" else min(n, degenerate_limit)
+            keys = keys[:size]
+            bst = BinarySearchTree(balanced)
+
+            start = time.perf_counter()
+            for key in keys:
+                bst.insert(key)
+            insert_time = time.perf_counter() - start
+
+            sample = random.sample(keys, min(probes, size))
+            start = time.perf_counter()
+            for key in sample:
+                bst.search(key)
+            search_time = time.perf_counter() - start
+
+            print(f"{'AVL' if balanced else 'обычное':>8} {order:>8} {size:>9} {insert_time:>11.2f} "
+                  f"{insert_time / size * 1e6:>12.2f} {bst.height():>7} {search_time / len(sample) * 1e6:>10.2f}")
+
+
+def benchmark_bulk_load(n=5 * 10**6):
+    # Сравнение пакетного построения дерева и пакетного удаления с поштучными insert/delete
+    keys = random.sample(range(n * 2), n)
+    doomed = random.sample(keys, n // 2)
+
+    start = time.perf_counter()
+    bst = BinarySearchTree.from_iterable(keys, balanced=True)
+    print(f"from_iterable, {n} случайных ключей: {time.perf_counter() - start:.2f} с, высота {bst.height()}")
+
+    start = time.perf_counter()
+    removed = bst.delete_many(doomed)
+    print(f"delete_many, {removed} ключей: {time.perf_counter() - start:.2f} с, осталось {len(bst)}")
+
+    start = time.perf_counter()
+    bst = BinarySearchTree.from_iterable(sorted(keys), balanced=True)
+    print(f"from_iterable, {n} отсортированных ключей: {time.perf_counter() - start:.2f} с")
+
+    start = time.perf_counter()
+    bst = BinarySearchTree(balanced=True)
+    for key in keys:
+        bst.insert(key)
+    print(f"insert по одному (AVL), {n} ключей: {time.perf_counter() - start:.2f} с")
+
+    start = time.perf_counter()
+    for key in doomed:
+        bst._delete_value(key)
+    print(f"delete по одному (AVL), {len(doomed)} ключей: {time.perf_counter() - start:.2f} с")
+
+
+class DictNode:
+    # Прежний узел без __slots__: атрибуты хранятся в словаре __dict__ каждого узла.
+    # Нужен только как точка сравнения в benchmark_memory
+    def __init__(self, value, parent=None):
+        self.value = value
+        self.left = None
+        self.right = None
+        self.parent = parent
+        self.height = 1
+        self.size = 1
+
+
+class DictNodeStorage:
+    # Хранилище, которое создает узлы DictNode, чтобы дерево строилось из прежних узлов
+    def clear(self):
+        pass
+
+    def create(self, value, parent=None):
+        return DictNode(value, parent)
+
+    def release(self, node):
+        pass
+
+
+def benchmark_memory(n=10**6):
+    # Память на один ключ для прежних узлов с __dict__, узлов-объектов Node и массивов ArrayNodeStorage
+    # (по данным tracemalloc)
+    keys = list(range(n))
+    for name, storage in (("Node (__dict__)", DictNodeStorage()), ("Node (__slots__)", None),
+                          ("ArrayNodeStorage", ArrayNodeStorage())):
+        tracemalloc.start()
+        bst = BinarySearchTree.from_iterable(keys, balanced=True, storage=storage)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for key in keys[::max(1, n // 10**4)]:
+            bst.search(key)
+        search_time = (time.perf_counter() - start) / len(keys[::max(1, n // 10**4)])
+        print(f"{name}: {memory / n:.1f} байт на ключ, поиск {search_time * 1e6:.2f} мкс")
+        del bst
+
+
+def stress_test_concurrent(readers=8, writers=2, ops=20000, stable=1000):
+    # Многопоточная проверка ConcurrentBinarySearchTree: стабильные ключи (никогда не удаляются)
+    # должны находиться читателями всегда, пока писатели вставляют и удаляют свои ключи.
+    # В конце проверяется содержимое дерева, размеры поддеревьев и баланс
+    bst = ConcurrentBinarySearchTree.from_iterable(range(0, stable * 2, 2), balanced=True)
+    errors = []
+    expected = [set() for _ in range(writers)]
+
+    def reader():
+        for _ in range(ops):
+            key = random.randrange(0, stable * 2, 2)
+            if bst.search(key) is None:
+                errors.append(f"ключ {key} не найден")
+
+    def writer(number):
+        own = expected[number]
+        for _ in range(ops):
+            key = stable * 2 + random.randrange(number, ops, writers) * 2 + 1  # У каждого писателя свои нечетные ключи
+            if key in own:
+                bst._delete_value(key)
+                own.discard(key)
+            else:
+                bst.insert(key)
+                own.add(key)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    keys = sorted(set(range(0, stable * 2, 2)).union(*expected))
+    if list(bst) != keys:
+        errors.append("содержимое дерева не совпадает с ожидаемым")
+    if len(bst) != len(keys) or bst.height() > 1.45 * len(keys).bit_length():
+        errors.append("нарушены размеры или баланс дерева")
+    print(f"{readers} читателей, {writers} писателей, по {ops} операций: {elapsed:.2f} с, "
+          f"{'ошибок нет' if not errors else f'ошибок: {len(errors)}, первая: {errors[0]}'}")
+    return not errors
+
+
+def benchmark_concurrent(n=10**5, seconds=2, thread_counts=(1, 2, 4, 8)):
+    # Пропускная способность поиска в ConcurrentBinarySearchTree при фоновом писателе
+    bst = ConcurrentBinarySearchTree.from_iterable(range(0, n * 2, 2), balanced=True)
+    for threads in thread_counts:
+        stop = threading.Event()
+        counts = [0] * (threads + 1)
+
+        def reader(number):
+            while not stop.is_set():
+                for _ in range(100):
+                    bst.search(random.randrange(n * 2))
+                counts[number] += 100
+
+        def writer():
+            while not stop.is_set():
+                key = random.randrange(n * 2, n * 4)
+                bst.insert(key)
+                bst._delete_value(key)
+                counts[threads] += 2
+
+        workers = [threading.Thread(target=reader, args=(number,)) for number in range(threads)]
+        workers.append(threading.Thread(target=writer))
+        for worker in workers:
+            worker.start()
+        time.sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        print(f"читателей {threads}: поиск {sum(counts[:threads]) / seconds:,.0f} оп/с, "
+              f"запись {counts[threads] / seconds:,.0f} оп/с")
+
+
+def benchmark_search_many(n=10**6, probes=10**5):
+    # Сравнение пакетного search_many с циклом search по одному ключу для обоих хранилищ узлов
+    keys = random.sample(range(n * 2), n)
+    queries = [random.randrange(n * 2) for _ in range(probes)]  # Примерно половина запросов есть в дереве
+    for name, storage in (("Node", None), ("ArrayNodeStorage", ArrayNodeStorage())):
+        bst = BinarySearchTree.from_iterable(keys, balanced=True, storage=storage)
+
+        start = time.perf_counter()
+        expected = [bst.search(value) is not None for value in queries]
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mask = bst.search_many(queries)
+        batch_time = time.perf_counter() - start
+
+        assert mask == expected
+        print(f"{name}, {probes} запросов к дереву из {n} ключей: search в цикле {loop_time:.3f} с, "
+              f"search_many {batch_time:.3f} с ({loop_time / batch_time:.1f}x), найдено {sum(mask)}")
+        del bst
+
+
+def benchmark_disk_btree(n=10**6, cache_pages=256):
+    # Построение DiskBTree, время повторного открытия файла и поиск при ограниченном кэше страниц
+    path = os.path.join(tempfile.mkdtemp(), "bench.btree")
+    keys = random.sample(range(n * 2), n)
+    start = time.perf_counter()
+    with DiskBTree(path, cache_pages) as tree:
+        for key in keys:
+            tree.insert(key)
+        assert len(tree._cache) <= cache_pages, "кэш страниц превысил cache_pages"
+    print(f"DiskBTree: вставка {n} ключей {time.perf_counter() - start:.2f} с, "
+          f"файл {os.path.getsize(path) / n:.1f} байт на ключ")
+
+    start = time.perf_counter()
+    tree = DiskBTree(path, cache_pages)
+    print(f"DiskBTree: открытие файла {(time.perf_counter() - start) * 1e3:.2f} мс, {len(tree)} ключей, высота {tree.height()}")
+    sample = random.sample(keys, min(n, 10**5))
+    start = time.perf_counter()
+    for key in sample:
+        tree.search(key)
+    print(f"DiskBTree: поиск {(time.perf_counter() - start) / len(sample) * 1e6:.2f} мкс при кэше {cache_pages} страниц")
+    tree.close()
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+class CLI:
+    def __init__(self, balanced=False, path=None, record=None):
+        # Если задан path, дерево хранится в файле (DiskBTree) и сохраняется между запусками.
+        # Если задан record, выполненные команды a/d/s дописываются в этот файл для повторного запуска в пакетном режиме
+        self.bst = DiskBTree(path) if path else BinarySearchTree(balanced)  # Создаем бинарное дерево
+        self.out = sys.stdout  # Куда выводятся результаты команд a/d/s, None - не выводить
+        self.log = open(record, "a", encoding="utf-8") if record else None
+
+    def _print(self, message):
+        # Вывод результата команды
+        if self.out is not None:
+            print(message, file=self.out)
+
+    def _read_value(self, value, prompt):
+        # Значение команды: переданное в пакетном режиме или введенное пользователем
+        return int(input(prompt) if value is None else value)
+
+    def _record(self, command, value):
+        # Запись команды в журнал в формате пакетного режима: вызывается сразу после успешной операции
+        if self.log is not None:
+            self.log.write(f"{command} {value}\n")
+
+    def close(self):
+        # Сохраняет дерево в файл и закрывает журнал команд
+        if isinstance(self.bst, DiskBTree):
+            self.bst.close()
+        if self.log is not None:
+            self.log.close()
 
     def run(self):
         # Основной цикл для работы через CLI
         while True:
-            command = input("Введите команду (a - add, d - delete, s - search, p - print, t - test, e - exit): ").lower()
+            command = input("Введите команду (a - add, d - delete, s - search, p - print, r - range, t - test, b - benchmark, c - concurrency, e - exit): ").lower()
 
             if command in  ["add", "a"]:
                 self.handle_insert()
@@ -135,44 +1276,142 @@ class CLI:
                 self.handle_search()
             elif command in ["print", "p"]:
                 self.handle_print()
+            elif command in ["range", "r"]:
+                self.handle_range()
             elif command in ["test", "t"]:
                 self.handle_test()
+            elif command in ["benchmark", "b"]:
+                self.handle_benchmark()
+            elif command in ["concurrency", "c"]:
+                self.handle_concurrency()
             elif command in ["exit", "e"]:
+                self.close()
                 print("Завершение работы.")
                 break
             else:
                 print("Неизвестная команда.")  
 
-    def handle_insert(self):
+    def run_batch(self, stream):
+        # Неинтерактивный режим: выполняет команды "a 5", "d 5", "s 5" (по одной в строке, # - комментарий)
+        # из потока stream. Вывод копится в буфере и сбрасывается крупными блоками.
+        # По окончании в stderr выводятся число операций в секунду и перцентили задержки по командам
+        handlers = {
+            "a": self.handle_insert, "add": self.handle_insert,
+            "d": self.handle_delete, "delete": self.handle_delete,
+            "s": self.handle_search, "search": self.handle_search,
+        }
+        output = self.out
+        if output is not None:
+            self.out = io.StringIO()
+        latencies = {handler.__name__: [] for handler in handlers.values()}
+
+        start = time.perf_counter()
+        try:
+            for line in stream:
+                parts = line.split()
+                if not parts or parts[0].startswith("#"):
+                    continue
+                handler = handlers.get(parts[0].lower())
+                if handler is None or len(parts) != 2:
+                    self._print(f"Неизвестная команда: {line.strip()}")
+                    continue
+                op_start = time.perf_counter_ns()
+                handler(parts[1])
+                latencies[handler.__name__].append(time.perf_counter_ns() - op_start)
+                if output is not None and self.out.tell() > 1 << 20:  # Сбрасываем буфер блоками по 1 МБ
+                    output.write(self.out.getvalue())
+                    self.out.seek(0)
+                    self.out.truncate()
+        finally:
+            # Накопленный вывод, сохранение дерева и сводка - при любом выходе из цикла, в том числе по исключению
+            elapsed = time.perf_counter() - start
+            if output is not None:
+                output.write(self.out.getvalue())
+                output.flush()
+                self.out = output
+            self.close()
+            self.report_latencies(latencies, elapsed)
+
+    def report_latencies(self, latencies, elapsed):
+        # Сводка пакетного режима: операций в секунду и перцентили задержки в микросекундах
+        total = sum(len(values) for values in latencies.values())
+        print(f"Выполнено {total} операций за {elapsed:.2f} с: {total / elapsed if elapsed else 0:,.0f} оп/с", file=sys.stderr)
+        print(f"{'команда':>14} {'операций':>10} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8}  (мкс)", file=sys.stderr)
+        for name, values in latencies.items():
+            if not values:
+                continue
+            values.sort()
+            percentiles = [values[min(len(values) - 1, int(len(values) * q))] / 1000 for q in (0.5, 0.9, 0.99, 0.999)]
+            print(f"{name:>14} {len(values):>10} " + " ".join(f"{p:>8.1f}" for p in percentiles)
+                  + f" {values[-1] / 1000:>8.1f}", file=sys.stderr)
+
+    def handle_insert(self, value=None):
         try:
-            value = int(input("Введите значение для добавления: "))
+            value = self._read_value(value, "Введите значение для добавления: ")
             self.bst.insert(value)
-            print(f"Элемент {value} добавлен.")
+            self._record("a", value)
+            self._print(f"Элемент {value} добавлен.")
         except ValueError:
-            print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
+            self._print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
 
-    def handle_delete(self):
+    def handle_delete(self, value=None):
         try:
-            value = int(input("Введите значение для удаления: "))
-            self.bst.delete(value)
+            value = self._read_value(value, "Введите значение для удаления: ")
+            deleted = self.bst._delete_value(value)
+            self._record("d", value)
+            if deleted:
+                self._print(f"Элемент {value} удален.")
+            else:
+                self._print(f"Значение {value} не найдено в дереве.")
         except ValueError:
-            print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
+            self._print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
 
-    def handle_search(self):
+    def handle_search(self, value=None):
         try:
-            value = int(input("Введите значение для поиска: "))
+            value = self._read_value(value, "Введите значение для поиска: ")
             node = self.bst.search(value)
-            if node:
-                print(f"Элемент {value} найден.")
+            self._record("s", value)
+            if node is not None:
+                self._print(f"Элемент {value} найден.")
             else:
-                print(f"Элемент {value} не найден.")
+                self._print(f"Элемент {value} не найден.")
         except ValueError:
-            print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
+            self._print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
 
     def handle_print(self):
         # Печать дерева
         self.bst.print_tree()
 
+    def handle_range(self):
+        # Вывод элементов из диапазона [lo, hi] и их позиций в дереве
+        try:
+            lo = int(input("Введите нижнюю границу: "))
+            hi = int(input("Введите верхнюю границу: "))
+        except ValueError:
+            print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
+            return
+        print(f"Элементы от {lo} до {hi}: {list(self.bst.items(lo, hi))}")
+        if isinstance(self.bst, BinarySearchTree):  # Размеры поддеревьев есть только в BinarySearchTree
+            print(f"Позиции в дереве: с {self.bst.rank(lo)} по {self.bst.rank(hi + 1) - 1} из {len(self.bst)}")
+
+    def handle_benchmark(self):
+        # Замер вставки отсортированных и случайных ключей в обычное и AVL-дерево
+        try:
+            n = int(input("Введите количество ключей (по умолчанию 1000000): ") or 10**6)
+        except ValueError:
+            print("Некорректный ввод.")  # Сообщение об ошибке, если введено не число
+            return
+        benchmark_insert_orders(n)
+        benchmark_bulk_load(n)
+        benchmark_memory(n)
+        benchmark_disk_btree(n)
+        benchmark_search_many(n)
+
+    def handle_concurrency(self):
+        # Многопоточная проверка и замер пропускной способности ConcurrentBinarySearchTree
+        stress_test_concurrent()
+        benchmark_concurrent()
+
     def handle_test(self):
         # Тестирование
         print("Тестирование бинарного дерева на подготовленном наборе данных")
@@ -185,7 +1424,7 @@ class CLI:
         print(f"Случайные числа от {min_n} до {max_n}:\n{numbers}")
         print("Будем добавлять их по одному в дерево")
         # 3. Создание дерева и печать пустого дерева
-        bst = BinarySearchTree()
+        bst = BinarySearchTree(self.bst.balanced)
         bst.print_tree()
 
         # 4. Добавление чисел в дерево по одному и печать дерева после каждого добавления
@@ -242,5 +1481,21 @@ class CLI:
         bst.delete(delete_value)
         bst.print_tree()
 
-cli = CLI()
-cli.run()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бинарное дерево поиска")
+    parser.add_argument("--balanced", action="store_true", help="балансировать дерево (AVL)")
+    parser.add_argument("--db", help="файл для хранения дерева (DiskBTree) между запусками")
+    parser.add_argument("--batch", metavar="ФАЙЛ", help="выполнить команды a/d/s из файла ('-' - из stdin) без диалога")
+    parser.add_argument("--quiet", action="store_true", help="в пакетном режиме не выводить результаты команд")
+    parser.add_argument("--record", metavar="ФАЙЛ", help="дописывать выполненные команды a/d/s в файл для запуска через --batch")
+    args = parser.parse_args()
+    cli = CLI(args.balanced, args.db, args.record)
+    if args.quiet:
+        cli.out = None
+    if args.batch == "-":
+        cli.run_batch(sys.stdin)
+    elif args.batch:
+        with open(args.batch, encoding="utf-8") as stream:
+            cli.run_batch(stream)
+    else:
+        cli.run()
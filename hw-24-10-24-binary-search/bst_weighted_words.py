@@ -1,4 +1,25 @@
-import random  
+import mmap
+import os
+import random
+import string
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+# Индекс слов: веса по возрастанию, слова в том же порядке и имя функции веса из WEIGHT_FUNCTIONS
+WordIndex = namedtuple("WordIndex", ["weights", "words", "scoring"])
+
+# Файл индекса: заголовок, веса (int64), смещения слов (n + 1 чисел int64), байты слов в UTF-8 подряд
+INDEX_MAGIC = b"WWIDX001"
+INDEX_HEADER = struct.Struct("<8s16sQQ")  # Метка, имя функции веса, число слов, длина байтов слов
+MASK64 = (1 << 64) - 1
+POLY_BASE = 0x100000001B3  # Нечетное основание полиномиального хеша (простое число FNV-1a)
 
 def generate_random_word_list():
     # Функция для генерации списка случайных слов.
@@ -9,55 +30,268 @@ def generate_random_word_list():
     ]
     return random_words  
 
+def generate_random_words(n, min_length=3, max_length=10):
+    # Функция для генерации n случайных слов из строчных латинских букв (для замеров скорости).
+    return ["".join(random.choices(string.ascii_lowercase, k=random.randint(min_length, max_length)))
+            for _ in range(n)]
+
 def calculate_word_weight(word):
     # Функция для вычисления веса слова.
     # Вес слова определяется как сумма значений Unicode всех его символов.
-    return sum(ord(char) for char in word)  
+    return sum(map(ord, word))
+
+def calculate_word_weights(word_list):
+    # Функция для вычисления весов всех слов сразу (NumPy).
+    # Все слова кодируются в один буфер UTF-32 (по 4 байта на символ, то есть по одному числу на код символа),
+    # вес слова - разность накопленных сумм кодов на границах слова
+    lengths = np.fromiter(map(len, word_list), dtype=np.int64, count=len(word_list))
+    codes = np.frombuffer("".join(word_list).encode("utf-32-le"), dtype=np.uint32)
+    sums = np.concatenate(([0], np.cumsum(codes, dtype=np.int64)))
+    ends = np.cumsum(lengths)
+    return sums[ends] - sums[ends - lengths]
+
+def poly_hash(word):
+    # Функция для вычисления полиномиального 64-битного хеша слова: h = h * POLY_BASE + код символа по модулю 2^64.
+    # В отличие от суммы кодов, учитывает порядок символов, и разные слова почти не совпадают по весу.
+    # Результат приводится к int64 со знаком, чтобы лечь в тот же столбец весов
+    h = 0
+    for char in word:
+        h = (h * POLY_BASE + ord(char)) & MASK64
+    return h - (1 << 64) if h >> 63 else h
+
+def poly_hashes(word_list, chunk_size=1_000_000):
+    # Функция для вычисления poly_hash всех слов сразу (NumPy).
+    # Хеш слова равен сумме код_i * POLY_BASE^(число символов после i-го) по модулю 2^64, а uint64 в NumPy
+    # переполняется как раз по модулю 2^64, поэтому, как в calculate_word_weights, это разность накопленных сумм.
+    # Слова обрабатываются пачками по chunk_size, чтобы не держать в памяти массивы на все символы словаря
+    hashes = np.empty(len(word_list), dtype=np.int64)
+    for first in range(0, len(word_list), chunk_size):
+        chunk = word_list[first:first + chunk_size]
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+        codes = np.frombuffer("".join(chunk).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        ends = np.cumsum(lengths)
+        powers = np.array([pow(POLY_BASE, k, 1 << 64) for k in range(int(lengths.max(initial=0)))], dtype=np.uint64)
+        after = np.repeat(ends, lengths) - 1 - np.arange(len(codes))  # Число символов слова после данного
+        sums = np.zeros(len(codes) + 1, dtype=np.uint64)
+        np.cumsum(codes * powers[after], out=sums[1:])
+        hashes[first:first + len(chunk)] = (sums[ends] - sums[ends - lengths]).view(np.int64)
+    return hashes
+
+# Функции веса: имя -> (вес одного слова, веса списка слов NumPy)
+WEIGHT_FUNCTIONS = {
+    "unicode_sum": (calculate_word_weight, calculate_word_weights),
+    "poly64": (poly_hash, poly_hashes),
+}
+
+def create_weighted_word_list(word_list, batch=True, scoring="unicode_sum"):
+    # Функция для создания индекса слов по весам.
+    # Индекс хранится по столбцам: веса в array('q') по возрастанию и слова в списке того же порядка.
+    # Слова с одинаковым весом идут подряд и отсортированы между собой, поэтому внутри такого
+    # участка слово тоже ищется бинарным поиском.
+    # batch=True - веса считаются и сортируются в NumPy, batch=False - по одному слову в цикле Python.
+    # scoring - имя функции веса из WEIGHT_FUNCTIONS
+    weight, batch_weights = WEIGHT_FUNCTIONS[scoring]
+    words = sorted(word_list)  # Сначала по алфавиту, затем устойчивой сортировкой по весу
+    if batch:
+        word_weights = batch_weights(words)
+        order = np.argsort(word_weights, kind="stable")
+        weights = array("q", word_weights[order].tobytes())
+        return WordIndex(weights, [words[i] for i in order.tolist()], scoring)
+    word_weights = [weight(word) for word in words]
+    order = sorted(range(len(words)), key=word_weights.__getitem__)  # Сортируем номера, а не пары (вес, слово)
+    weights = array("q", [word_weights[i] for i in order])
+    return WordIndex(weights, [words[i] for i in order], scoring)
+
+def read_words(path):
+    # Функция для чтения слов из файла (по одному в строке). Файл читается построчно, а не целиком
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            word = line.strip()
+            if word:
+                yield word
+
+class WordColumn:
+    # Столбец слов индекса из файла: слово декодируется из отображенных в память байтов только при обращении,
+    # поэтому открытие индекса не зависит от размера словаря. Поддерживает len, [i] и срезы, этого достаточно для bisect
+    def __init__(self, data, offsets):
+        self.data = data  # Байты всех слов подряд
+        self.offsets = offsets  # n + 1 смещений: слово i - data[offsets[i]:offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
 
-def create_weighted_word_list(word_list):
-    # Функция для создания списка словарей с весами слов и их сортировки.
-    weighted_list = [{calculate_word_weight(word): word} for word in word_list]
-    # Сортируем список по весам (ключам словарей)
-    return sorted(weighted_list, key=lambda x: list(x.keys())[0])
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+def save_index(weighted_list, path):
+    # Функция для записи индекса в двоичный файл.
+    encoded = [word.encode() for word in weighted_list.words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    with open(path, "wb") as file:
+        file.write(INDEX_HEADER.pack(INDEX_MAGIC, weighted_list.scoring.encode(), len(encoded), int(offsets[-1])))
+        file.write(bytes(weighted_list.weights))
+        file.write(offsets.tobytes())
+        file.write(b"".join(encoded))
+
+def load_index(path):
+    # Функция для открытия индекса из файла: файл отображается в память, веса и смещения - представления
+    # memoryview поверх него без копирования, слова читаются лениво (WordColumn). Время не зависит от числа слов
+    with open(path, "rb") as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, scoring, n, data_size = INDEX_HEADER.unpack_from(mm, 0)
+    if magic != INDEX_MAGIC:
+        raise ValueError(f"Файл {path} не является индексом слов")
+    view = memoryview(mm)
+    start = INDEX_HEADER.size
+    weights = view[start:start + 8 * n].cast("q")
+    offsets = view[start + 8 * n:start + 8 * (2 * n + 1)].cast("q")
+    data = view[start + 8 * (2 * n + 1):start + 8 * (2 * n + 1) + data_size]
+    return WordIndex(weights, WordColumn(data, offsets), scoring.rstrip(b"\0").decode())
+
+def open_word_index(words_path, scoring="unicode_sum"):
+    # Функция для получения индекса словаря words_path: готовый файл индекса рядом со словарем открывается сразу,
+    # а если его нет или словарь новее, индекс строится из словаря и сохраняется для следующих запусков
+    index_path = f"{words_path}.{scoring}.idx"
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(words_path):
+        save_index(create_weighted_word_list(list(read_words(words_path)), scoring=scoring), index_path)
+    return load_index(index_path)
 
 def binary_search_by_weight(weighted_list, target_weight):
     # Функция для бинарного поиска по весу.
-    left, right = 0, len(weighted_list) - 1  # Устанавливаем границы поиска
-
-    while left <= right:  # Пока границы не пересекутся
-        mid = (left + right) // 2  # Находим середину
-        mid_weight = list(weighted_list[mid].keys())[0]
-        
-        # Проверяем, совпадает ли вес
-        if mid_weight == target_weight:
-            return mid  # Возвращаем индекс, если вес совпадает
-        elif mid_weight < target_weight:
-            left = mid + 1  # Сужаем поиск в правую половину
-        else:
-            right = mid - 1  # Сужаем поиск в левую половину
-
-    return None  # Если не найдено, возвращаем None
+    # Возвращает границы [left, right) участка всех слов с весом target_weight (пустой, если таких нет)
+    weights = weighted_list.weights
+    left = bisect_left(weights, target_weight)  # Первое слово с весом не меньше искомого
+    right = bisect_right(weights, target_weight, left)  # Первое слово с большим весом
+    return left, right
+
+def words_with_weight(weighted_list, target_weight):
+    # Функция, возвращающая все слова с данным весом (коллизии веса).
+    left, right = binary_search_by_weight(weighted_list, target_weight)
+    return weighted_list.words[left:right]
 
 def binary_search_word(weighted_list, target_word):
     # Функция для бинарного поиска слова в списке с учетом веса.
-    # Сначала вычисляем вес искомого слова.
-    target_weight = calculate_word_weight(target_word)
-    # бинарный поиск значения target_weight
-    index = binary_search_by_weight(weighted_list, target_weight)  
-
-    if index is not None:  # индекс найден
-        mid_word = weighted_list[index][target_weight]
-        if mid_word == target_word:
-            return index, target_weight, mid_word  # Слово найдено
+    # Сначала вычисляем вес искомого слова той же функцией, что и при построении индекса.
+    target_weight = WEIGHT_FUNCTIONS[weighted_list.scoring][0](target_word)
+    # бинарный поиск участка слов с весом target_weight
+    left, right = binary_search_by_weight(weighted_list, target_weight)
+    # среди слов с тем же весом ищем само слово, они отсортированы
+    words = weighted_list.words
+    index = bisect_left(words, target_word, left, right)
+    if index < right and words[index] == target_word:
+        return index, target_weight, target_word  # Слово найдено
     return None, target_weight, target_word  # Если слово не найдено
 
+def binary_search_words(weighted_list, target_words):
+    # Функция для поиска сразу многих слов.
+    # Веса запросов считаются одним пакетным вызовом функции веса, границы участков их весов находит
+    # np.searchsorted по столбцу весов (без копирования array), а внутри участка слово ищется bisect.
+    # Возвращает список таких же троек (индекс или None, вес, слово), как binary_search_word
+    weights, words, scoring = weighted_list
+    target_weights = WEIGHT_FUNCTIONS[scoring][1](target_words)
+    column = np.frombuffer(weights, dtype=np.int64)
+    lefts = np.searchsorted(column, target_weights, side="left").tolist()
+    rights = np.searchsorted(column, target_weights, side="right").tolist()
+    results = []
+    for word, weight, left, right in zip(target_words, target_weights.tolist(), lefts, rights):
+        index = bisect_left(words, word, left, right)
+        results.append((index if index < right and words[index] == word else None, weight, word))
+    return results
+
+def benchmark_search(n=10**6, queries=10**4):
+    # Замер построения индекса и поиска слов на словаре из n случайных слов.
+    words = generate_random_words(n)
+    start = time.perf_counter()
+    weighted_list = create_weighted_word_list(words)
+    build_time = time.perf_counter() - start
+    distinct = len(set(weighted_list[0]))
+    print(f"{n} слов: построение индекса {build_time:.2f} с, различных весов {distinct}, "
+          f"в среднем {n / distinct:.0f} слов на вес")
+
+    sample = random.sample(words, queries)
+    start = time.perf_counter()
+    found = sum(binary_search_word(weighted_list, word)[0] is not None for word in sample)
+    search_time = time.perf_counter() - start
+    print(f"поиск: {search_time / queries * 1e6:.2f} мкс на слово, найдено {found} из {queries}")
+
+def benchmark_batch(n=10**6, queries=10**5):
+    # Сравнение цикла по словам и пакетных функций NumPy: веса, построение индекса и поиск многих слов.
+    words = generate_random_words(n)
+    sample = random.sample(words, queries)
+    print(f"{'операция':>20} {'по одному, с':>13} {'пакетом, с':>11} {'ускорение':>10}")
+
+    def compare(name, one_by_one, batch):
+        start = time.perf_counter()
+        slow = one_by_one()
+        slow_time = time.perf_counter() - start
+        start = time.perf_counter()
+        fast = batch()
+        fast_time = time.perf_counter() - start
+        print(f"{name:>20} {slow_time:>13.3f} {fast_time:>11.3f} {slow_time / fast_time:>9.1f}x")
+        return slow, fast
+
+    slow, fast = compare(f"веса {n} слов", lambda: [calculate_word_weight(word) for word in words],
+                         lambda: calculate_word_weights(words))
+    assert slow == fast.tolist()
+    slow, fast = compare("индекс", lambda: create_weighted_word_list(words, batch=False),
+                         lambda: create_weighted_word_list(words))
+    assert slow == fast
+    slow, fast = compare(f"поиск {queries} слов", lambda: [binary_search_word(fast, word) for word in sample],
+                         lambda: binary_search_words(fast, sample))
+    assert slow == fast
+
+def benchmark_index_file(n=10**7, queries=10**4):
+    # Словарь из n слов в файле: построение и запись индекса, открытие готового индекса (холодный старт)
+    # и поиск по нему для каждой функции веса, а также число коллизий веса.
+    directory = tempfile.mkdtemp()
+    words_path = os.path.join(directory, "words.txt")
+    words = generate_random_words(n)
+    with open(words_path, "w", encoding="utf-8") as file:
+        file.write("\n".join(words))
+    sample = random.sample(words, queries)
+    del words
+    for scoring in WEIGHT_FUNCTIONS:
+        start = time.perf_counter()
+        open_word_index(words_path, scoring)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        weighted_list = open_word_index(words_path, scoring)
+        open_time = time.perf_counter() - start
+        start = time.perf_counter()
+        found = sum(binary_search_word(weighted_list, word)[0] is not None for word in sample)
+        search_time = time.perf_counter() - start
+        distinct = len(np.unique(np.frombuffer(weighted_list.weights, dtype=np.int64)))
+        index_size = os.path.getsize(f"{words_path}.{scoring}.idx")
+        print(f"{scoring}: {n} слов, построение {build_time:.1f} с, файл {index_size / n:.1f} байт на слово, "
+              f"открытие {open_time * 1e3:.2f} мс, поиск {search_time / queries * 1e6:.1f} мкс "
+              f"(найдено {found} из {queries}), различных весов {distinct}, в среднем {n / distinct:.1f} слов на вес")
+        del weighted_list
+        os.remove(f"{words_path}.{scoring}.idx")
+    os.remove(words_path)
+    os.rmdir(directory)
+
 # Основная программа
-word_list = generate_random_word_list()  # Генерируем список слов
-weighted_word_list = create_weighted_word_list(word_list)  # Создаем и сортируем список весов
+# python bst_weighted_words.py words.txt [poly64] - поиск по словарю из файла (по слову в строке);
+# индекс сохраняется рядом со словарем и при следующем запуске только открывается
+if len(sys.argv) > 1:
+    weighted_word_list = open_word_index(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "unicode_sum")
+else:
+    word_list = generate_random_word_list()  # Генерируем список слов
+    weighted_word_list = create_weighted_word_list(word_list)  # Создаем индекс слов по весам
 
-print("Для завершения введите 0")  # Уведомление для пользователя
+print("Для завершения введите 0, для замера скорости на большом словаре - 1")  # Уведомление для пользователя
 # Запрашиваем слово для поиска у пользователя
 while (search_word := input("Введите слово для поиска: ").strip().lower()) != '0':
+    if search_word == '1':
+        benchmark_search()
+        benchmark_batch()
+        benchmark_index_file()
+        continue
     # ищем слово
     index, weight, found_word = binary_search_word(weighted_word_list, search_word)
     # Выводим результат
@@ -65,3 +299,7 @@ while (search_word := input("Введите слово для поиска: ").s
         print(f"Слово '{found_word}' найдено на индексе {index} с весом {weight}.")
     else:
         print(f"Слово '{search_word}' не найдено.")  
+    # Слова с тем же весом (коллизии)
+    others = [word for word in words_with_weight(weighted_word_list, weight) if word != search_word]
+    if others:
+        print(f"Другие слова с весом {weight}: {', '.join(others)}")
@@ -1,8 +1,152 @@
 # Базовый http-сервер
-from flask import Flask, jsonify, request
+# Режимы запуска (--mode):
+#   dev      - встроенный сервер Flask с отладкой, один процесс (по умолчанию)
+#   waitress - многопоточный сервер waitress, один процесс; работает и в Windows
+#   gunicorn - несколько процессов-воркеров (--workers) с пулом потоков (--threads) в каждом, только Linux/macOS
+# Оба сервера держат соединения keep-alive, --keepalive задает, сколько секунд ждать следующего запроса.
+# Нагрузочный тест режимов - load-test.py в этой же папке
+# Ответы /api/data и /factorial кэшируются (декоратор cached): в памяти процесса или в Redis (--cache-url),
+# с ETag, поэтому повторный запрос с If-None-Match получает 304 без тела. Статистика кэша - /metrics/cache
+# /api/submit/batch принимает много записей за запрос (NDJSON или JSON-массив) и разбирает тело по частям
+# /metrics - метрики запросов в текстовом формате Prometheus (гистограммы задержек и размеров по маршрутам,
+# число запросов в обработке); /debug/profile - выборочный профилировщик, включается параметром --profiler
+import argparse
+import codecs
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict
+from decimal import MAX_EMAX, MAX_PREC, MIN_EMIN, Context, Decimal
+from urllib.parse import urlencode
+
+from flask import Flask, Response, g, jsonify, make_response, request
 
 # создаём приложение Flask
 app = Flask(__name__)
+app.config["FACTORIAL_MAX"] = 100000  # Наибольшее n для /factorial, меняется параметром --factorial-max
+app.config["PROFILER"] = False  # Доступен ли /debug/profile, включается параметром --profiler
+
+# Факториалы считаются в Decimal с неограниченной точностью: libmpdec умножает большие числа быстрее int
+# (теоретико-числовым преобразованием), а перевод в строку у него линейный, тогда как str(int) квадратичен
+# и для int длиннее 4300 цифр еще и запрещен по умолчанию (sys.set_int_max_str_digits)
+EXACT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+FACTORIAL_CACHE_ENTRIES = 64  # Сколько факториалов хранится в кэше
+FACTORIAL_CACHE_DIGITS = 20_000_000  # Сколько цифр всего хранится в кэше (примерно столько же байт памяти)
+STREAM_DIGITS = 100_000  # Результат длиннее этого отдается потоком по STREAM_CHUNK символов
+STREAM_CHUNK = 65536
+READ_CHUNK = 65536  # По сколько байт читается тело пакетного запроса
+
+factorial_cache = OrderedDict()  # n -> n!, в порядке последнего использования
+factorial_keys = []  # Отсортированные n из кэша для поиска ближайшего меньшего
+factorial_cache_digits = 0
+factorial_lock = threading.Lock()  # Кэш общий для всех потоков процесса
+
+
+# кэш ответов в памяти процесса: не больше max_entries записей, вытесняется давно не использованная
+class LocalCache:
+    name = "local"
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # ключ -> (срок годности, тип содержимого, ETag, тело)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():  # Запись устарела
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1:]
+
+    def set(self, key, content_type, etag, body, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, content_type, etag, body)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# общий кэш ответов в Redis для нескольких процессов или серверов; запись - хеш Redis со сроком жизни ttl
+class RedisCache:
+    name = "redis"
+    prefix = "response:"  # Ключи кэша в Redis, остальные ключи базы не трогаются и не считаются
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise SystemExit("Для кэша в Redis установите пакет: pip install redis")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        entry = self.client.hgetall(self.prefix + key)
+        if not entry:
+            return None
+        return entry[b"content_type"].decode(), entry[b"etag"].decode(), entry[b"body"]
+
+    def set(self, key, content_type, etag, body, ttl):
+        pipe = self.client.pipeline()
+        pipe.hset(self.prefix + key, mapping={"content_type": content_type, "etag": etag, "body": body})
+        pipe.expire(self.prefix + key, ttl)
+        pipe.execute()
+
+    # число записей кэша: только ключи с prefix, а не dbsize() всей базы, которую могут делить с другими
+    # приложениями. SCAN обходит базу по частям и не блокирует Redis, но число приблизительное: записи
+    # могут истечь или появиться во время обхода
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*", count=1000))
+
+
+response_cache = LocalCache()  # Заменяется на RedisCache параметром --cache-url
+cache_stats = {"hits": 0, "misses": 0, "not_modified": 0}  # Счетчики процесса (у каждого воркера gunicorn свои)
+cache_stats_lock = threading.Lock()
+
+def count_cache(event):
+    with cache_stats_lock:
+        cache_stats[event] += 1
+
+# декоратор кэширования ответа маршрута на ttl секунд. Ключ - путь и отсортированные параметры запроса.
+# Кэшируются только ответы 200, которые не отдаются потоком. ETag - хеш тела: если клиент прислал его
+# в If-None-Match, возвращается 304 без тела
+def cached(ttl=60):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Параметры кодируются заново (urlencode), иначе "number=5&x=1" и "number=5%26x%3D1" дали бы один ключ
+            key = request.path + "?" + urlencode(sorted(request.args.items(multi=True)))
+            entry = response_cache.get(key)
+            if entry is None:
+                count_cache("misses")
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = (response.content_type, hashlib.blake2b(body, digest_size=16).hexdigest(), body)
+                response_cache.set(key, *entry, ttl)
+            else:
+                count_cache("hits")
+            content_type, etag, body = entry
+            response = Response(body, 200, content_type=content_type)
+            response.set_etag(etag)
+            response.cache_control.max_age = ttl
+            response.make_conditional(request)  # 304, если ETag совпал с If-None-Match
+            if response.status_code == 304:
+                count_cache("not_modified")
+            return response
+        return wrapper
+    return decorator
 
 # главная страница
 @app.route('/')
@@ -11,6 +155,7 @@ def home():
 
 # маршрут для возврата JSON-ответа
 @app.route('/api/data', methods=['GET'])
+@cached(ttl=60)
 def get_data():
     data = {
         "message": "This is some data from the server",
@@ -28,38 +173,387 @@ def submit_data():
     }
     return jsonify(response), 201  # Возвращаем JSON с кодом ответа 201 (Created)
 
-# функция для вычисления факториала
+# ошибка разбора тела пакетного запроса
+class BatchError(ValueError):
+    pass
+
+# куски тела запроса в виде текста; многобайтовые символы utf-8 на границе кусков собираются декодером
+def read_text(stream):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while chunk := stream.read(READ_CHUNK):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+# записи NDJSON (по одному JSON-документу в строке) по мере чтения тела. С separator="\x1e" разбирается
+# JSON Text Sequence (RFC 7464): каждая запись начинается с символа RS, а внутри может содержать переводы строк
+def iter_ndjson(stream, separator="\n"):
+    tail = ""
+    for text in read_text(stream):
+        lines = (tail + text).split(separator)
+        tail = lines.pop()  # Последняя строка может быть не дочитана
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if tail.strip():
+        yield json.loads(tail)
+
+# элементы JSON-массива по мере чтения тела: raw_decode разбирает по одному элементу, а в буфере держится
+# только недочитанный хвост. Число, за которым в буфере нет символа, не продолжающего его ("12" + "34", "1." + "5"),
+# разбирается заново после следующего куска, поэтому разрезанное число не примется за два
+def iter_json_array(stream):
+    decoder = json.JSONDecoder()
+    chunks = read_text(stream)
+    buffer, pos, eof = "", 0, False
+    state = "start"  # start - ждем '[', value - элемент, next - ',' или ']'
+
+    def fill():
+        nonlocal buffer, pos, eof
+        text = next(chunks, None)
+        if text is None:
+            eof = True
+        buffer, pos = buffer[pos:] + (text or ""), 0
+
+    # после закрывающей ']' тело дочитывается: там допустимы только пробельные символы
+    def finish():
+        rest = buffer[pos + 1:]
+        while True:
+            if rest.strip():
+                raise BatchError(f"Лишние данные после JSON-массива: {rest.strip()[:20]!r}")
+            rest = next(chunks, None)
+            if rest is None:
+                return
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise BatchError("Неожиданный конец JSON-массива")
+            fill()
+            continue
+        if state == "start":
+            if buffer[pos] != "[":
+                raise BatchError("Ожидался JSON-массив")
+            pos += 1
+            state = "first"
+        elif state == "first" and buffer[pos] == "]":
+            return finish()
+        elif state in ("first", "value"):
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()  # Элемент еще не дочитан
+                continue
+            if (not eof and isinstance(record, (int, float)) and not isinstance(record, bool)
+                    and (end == len(buffer) or buffer[end] in ".eE+-")):
+                fill()
+                continue
+            pos = end
+            state = "next"
+            yield record
+        else:
+            if buffer[pos] == "]":
+                return finish()
+            if buffer[pos] != ",":
+                raise BatchError(f"Ожидалась ',' или ']', получено {buffer[pos]!r}")
+            pos += 1
+            state = "value"
+
+# маршрут для пакетной загрузки записей: NDJSON (Content-Type application/x-ndjson), JSON Text Sequence
+# (application/json-seq) или JSON-массив. Тело разбирается по частям и целиком в памяти не хранится,
+# в ответе только счетчики
+@app.route('/api/submit/batch', methods=['POST'])
+def submit_batch():
+    if request.mimetype == "application/json-seq":
+        records = iter_ndjson(request.stream, "\x1e")
+    elif request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        records = iter_ndjson(request.stream)
+    else:
+        records = iter_json_array(request.stream)
+    received = rejected = 0
+    try:
+        for record in records:
+            if isinstance(record, dict):  # Запись - JSON-объект, остальное не принимаем
+                received += 1
+            else:
+                rejected += 1
+    except ValueError as error:  # json.JSONDecodeError и BatchError
+        return jsonify({"received": received, "rejected": rejected, "error": str(error)}), 400
+    return jsonify({"received": received, "rejected": rejected, "message": "Data received successfully"}), 201
+
+# произведение lo * (lo + 1) * ... * (hi - 1) бинарным разбиением: перемножаются числа близкой длины,
+# что для больших чисел намного быстрее, чем домножать растущее произведение на маленькие множители
+def product(lo, hi):
+    if hi - lo <= 16:
+        result = 1
+        for i in range(lo, hi):
+            result *= i
+        return Decimal(result)
+    mid = (lo + hi) // 2
+    return EXACT.multiply(product(lo, mid), product(mid, hi))
+
+# сохранение факториала в кэш; давно не использованные значения вытесняются, пока кэш не уложится в ограничения
+def cache_factorial(n, value):
+    global factorial_cache_digits
+    digits = value.adjusted() + 1
+    if digits > FACTORIAL_CACHE_DIGITS:
+        return
+    with factorial_lock:
+        if n in factorial_cache:
+            return
+        factorial_cache[n] = value
+        insort(factorial_keys, n)
+        factorial_cache_digits += digits
+        while len(factorial_cache) > FACTORIAL_CACHE_ENTRIES or factorial_cache_digits > FACTORIAL_CACHE_DIGITS:
+            old_n, old_value = factorial_cache.popitem(last=False)
+            del factorial_keys[bisect_right(factorial_keys, old_n) - 1]
+            factorial_cache_digits -= old_value.adjusted() + 1
+
+# функция для вычисления факториала (точное значение типа Decimal)
+# начинаем с наибольшего k <= n из кэша и домножаем k! на (k + 1) * ... * n
 def factorial(n):
-    result = 1
-    for i in range(1, n + 1):
-        result *= i
+    with factorial_lock:
+        i = bisect_right(factorial_keys, n)
+        k = factorial_keys[i - 1] if i else 0
+        base = Decimal(1)
+        if k:
+            base = factorial_cache[k]
+            factorial_cache.move_to_end(k)
+    if k == n:
+        return base
+    result = EXACT.multiply(base, product(k + 1, n + 1))
+    cache_factorial(n, result)
     return result
 
 # маршрут для вычисления факториала
 @app.route('/factorial', methods=['GET'])
+@cached(ttl=3600)
 def calculate_factorial():
     # Получаем параметр из запроса
     number_str = request.args.get('number')
+    max_number = app.config["FACTORIAL_MAX"]
     
-    # Проверка: существует ли параметр и является ли он целым числом от 1 до 100
+    # Проверка: существует ли параметр и является ли он целым числом от 1 до FACTORIAL_MAX
     if not number_str or not number_str.isdigit():
-        return "Введите целое число от 1 до 100", 400  # Ошибка 400 — неверный запрос
+        return f"Введите целое число от 1 до {max_number}", 400  # Ошибка 400 — неверный запрос
 
     number = int(number_str)
-    if number < 1 or number > 100:
-        return "Введите целое число от 1 до 100", 400  # Ошибка 400 — неверный запрос
+    if number < 1 or number > max_number:
+        return f"Введите целое число от 1 до {max_number}", 400  # Ошибка 400 — неверный запрос
 
     # Если проверка пройдена, вычисляем факториал
-    fact = factorial(number)
-    return f"Введено число {number}<br>{number}! = {fact}", 200
+    fact = format(factorial(number), "f")
+    if len(fact) <= STREAM_DIGITS:
+        return f"Введено число {number}<br>{number}! = {fact}", 200
+
+    # Длинный результат отдаем частями, не собирая весь ответ в одну строку
+    def generate():
+        yield f"Введено число {number}<br>{number}! = "
+        for start in range(0, len(fact), STREAM_CHUNK):
+            yield fact[start:start + STREAM_CHUNK]
+
+    return Response(generate(), 200, mimetype="text/html")
+
+# статистика кэша ответов
+@app.route('/metrics/cache', methods=['GET'])
+def cache_metrics():
+    with cache_stats_lock:
+        stats = dict(cache_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    stats["backend"] = response_cache.name
+    stats["entries"] = len(response_cache)
+    return jsonify(stats)
+
+# гистограмма в духе Prometheus: счетчики по верхним границам корзин, сумма и число наблюдений
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # строки метрики name с метками labels: накопительные корзины le, _sum и _count.
+    # Числа выводятся через repr без потери точности: :g оставил бы 6 значащих цифр и испортил rate(_sum)
+    def lines(self, name, labels):
+        total = 0
+        for bound, number in zip(self.buckets + [float("inf")], self.counts):
+            total += number
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f'{name}_bucket{{{labels},le="{le}"}} {total}'
+        yield f"{name}_sum{{{labels}}} {self.sum!r}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]  # Секунды
+SIZE_BUCKETS = [100, 1000, 10_000, 100_000, 1_000_000, 10_000_000]  # Байты
+
+# метрики процесса (у каждого воркера gunicorn свои); ключ - (маршрут, метод)
+request_latency = {}
+request_size = {}
+response_size = {}
+request_status = Counter()  # (маршрут, метод, код ответа) -> число запросов
+requests_in_flight = 0
+metrics_lock = threading.Lock()
+
+# маршрут запроса для меток: шаблон правила (/factorial), а не конкретный адрес, чтобы число рядов не росло
+def route_label():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+@app.before_request
+def metrics_start():
+    global requests_in_flight
+    g.metrics_start = time.perf_counter()
+    with metrics_lock:
+        requests_in_flight += 1
+
+@app.after_request
+def metrics_response(response):
+    key = (route_label(), request.method)
+    with metrics_lock:
+        request_status[key + (response.status_code,)] += 1
+        if request.content_length is not None:
+            request_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(request.content_length)
+        if response.content_length is not None:  # У потоковых ответов размер заранее неизвестен
+            response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(response.content_length)
+    return response
+
+# выполняется и при исключении в обработчике, поэтому счетчик запросов в обработке не "залипает"
+@app.teardown_request
+def metrics_finish(error=None):
+    global requests_in_flight
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    with metrics_lock:
+        requests_in_flight -= 1
+        request_latency.setdefault((route_label(), request.method), Histogram(LATENCY_BUCKETS)).observe(elapsed)
+
+# метрики в текстовом формате Prometheus
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    lines = []
+    with metrics_lock:
+        lines += ["# HELP http_requests_in_flight Запросы в обработке", "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {requests_in_flight}"]
+        lines += ["# HELP http_requests_total Обработанные запросы", "# TYPE http_requests_total counter"]
+        for (route, method, status), number in sorted(request_status.items()):
+            lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {number}')
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Время обработки запроса", request_latency),
+            ("http_request_size_bytes", "Размер тела запроса", request_size),
+            ("http_response_size_bytes", "Размер тела ответа", response_size),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (route, method), histogram in sorted(histograms.items()):
+                lines += histogram.lines(name, f'route="{route}",method="{method}"')
+    with cache_stats_lock:
+        stats = dict(cache_stats)
+    lines += ["# HELP response_cache_events_total События кэша ответов", "# TYPE response_cache_events_total counter"]
+    lines += [f'response_cache_events_total{{event="{event}"}} {number}' for event, number in stats.items()]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+# подпись кадра для свернутых стеков: функция (файл:строка начала)
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+# выборочный профилировщик: seconds секунд с шагом interval снимает стеки всех потоков процесса
+# (кроме своего) через sys._current_frames и возвращает их в свернутом виде "корень;...;лист число",
+# который понимают flamegraph.pl и speedscope. Пока идет замер, обработчик занимает один поток сервера
+@app.route('/debug/profile', methods=['GET'])
+def profile():
+    if not app.config["PROFILER"]:
+        return "Профилировщик выключен, запустите сервер с параметром --profiler", 404
+    seconds = min(request.args.get("seconds", 5, type=float), 60)
+    interval = max(request.args.get("interval", 0.005, type=float), 0.001)
+    me = threading.get_ident()
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stacks[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    body = "".join(f"{stack} {number}\n" for stack, number in stacks.most_common())
+    return Response(body, mimetype="text/plain")
+
+# запуск встроенного сервера Flask для разработки
+def run_dev(args):
+    app.run(host=args.host, port=args.port, debug=True)
+
+# запуск через waitress: один процесс, запросы обслуживает пул из args.threads потоков
+def run_waitress(args):
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("Для режима waitress установите пакет: pip install waitress")
+    # channel_timeout - сколько секунд неактивное соединение keep-alive остается открытым
+    serve(app, host=args.host, port=args.port, threads=args.threads, channel_timeout=args.keepalive)
+
+# запуск через gunicorn: args.workers процессов, в каждом пул из args.threads потоков (воркер gthread)
+def run_gunicorn(args):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("Для режима gunicorn установите пакет: pip install gunicorn (только Linux/macOS)")
+
+    class GunicornApp(BaseApplication):
+        # Встраивание gunicorn: настройки берутся из аргументов командной строки, а не из файла конфигурации
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("keepalive", args.keepalive)
+
+        def load(self):
+            return app
+
+    GunicornApp().run()
 
 # запуск сервера
 if __name__ == '__main__':
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Базовый http-сервер")
+    parser.add_argument("--mode", choices=["dev", "waitress", "gunicorn"], default="dev", help="режим запуска")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="число процессов (gunicorn)")
+    parser.add_argument("--threads", type=int, default=8, help="число потоков в процессе (waitress, gunicorn)")
+    parser.add_argument("--keepalive", type=int, default=5, help="секунд ожидания следующего запроса в соединении")
+    parser.add_argument("--factorial-max", type=int, default=app.config["FACTORIAL_MAX"], help="наибольшее n для /factorial")
+    parser.add_argument("--cache-size", type=int, default=1024, help="записей в кэше ответов процесса")
+    parser.add_argument("--cache-url", help="адрес Redis для общего кэша ответов, например redis://localhost:6379/0")
+    parser.add_argument("--profiler", action="store_true", help="включить выборочный профилировщик /debug/profile")
+    args = parser.parse_args()
+    app.config["FACTORIAL_MAX"] = args.factorial_max
+    app.config["PROFILER"] = args.profiler
+    response_cache = RedisCache(args.cache_url) if args.cache_url else LocalCache(args.cache_size)
+    {"dev": run_dev, "waitress": run_waitress, "gunicorn": run_gunicorn}[args.mode](args)
 
 
 # проверка запросов в powershell
 '''
+запуск в рабочем режиме
+python base-http-server.py --mode waitress --threads 16
+python3 base-http-server.py --mode gunicorn --workers 4 --threads 8   (Linux/macOS)
+нагрузочный тест всех режимов
+python load-test.py --modes dev waitress gunicorn --duration 10
+сравнение загрузки записей по одной и пачками
+python load-test.py --modes waitress --batch-records 100000 --batch-size 1000
 проверка get-запроса в powershell
 Invoke-WebRequest -Uri http://127.0.0.1:5000/api/data -Method GET
 проверка вычисления факториала
@@ -68,4 +562,14 @@ Invoke-WebRequest -Uri "http://127.0.0.1:5000/factorial?number=5" -Method GET
 $headers = @{"Content-Type"="application/json"}
 $body = '{"key": {"username": "john_doe", "email": "john@example.com"}}'  # JSON-данные о пользователе
 Invoke-WebRequest -Uri http://127.0.0.1:5000/api/submit -Method POST -Headers $headers -Body $body
+проверка кэша ответов: второй запрос с ETag из первого возвращает 304
+$r = Invoke-WebRequest -Uri http://127.0.0.1:5000/api/data -Method GET
+Invoke-WebRequest -Uri http://127.0.0.1:5000/api/data -Method GET -Headers @{"If-None-Match"=$r.Headers.ETag}
+Invoke-WebRequest -Uri http://127.0.0.1:5000/metrics/cache -Method GET
+проверка пакетной загрузки
+$body = '{"id": 1}' + "`n" + '{"id": 2}'
+Invoke-WebRequest -Uri http://127.0.0.1:5000/api/submit/batch -Method POST -ContentType "application/x-ndjson" -Body $body
+метрики и профилирование (сервер запущен с --profiler), результат - свернутые стеки для flamegraph.pl или speedscope
+Invoke-WebRequest -Uri http://127.0.0.1:5000/metrics -Method GET
+Invoke-WebRequest -Uri "http://127.0.0.1:5000/debug/profile?seconds=10" -Method GET -OutFile profile.folded
 '''
@@ -1,91 +1,1136 @@
 # Хеш-таблица с двойным хешированием для разрешения коллизий
 # класс HashTable с функцией изменения размера resize
-# Вставка осуществляется с использованием двух хеш-функций: первая вычисляет основной индекс, а вторая добавляет смещение при возникновении коллизий
-# Код для проверки таблицы позволяет пользователю добавлять или удалять значения и видеть текущую таблицу после каждого действия
+# Размер таблицы - степень двойки. Хеш ключа перемешивается умножением на нечетную 64-битную константу:
+# старшие разряды дают начальный индекс, младшие - нечетный шаг пробирования, поэтому последовательность проб
+# обходит все ячейки таблицы. Удаленные элементы помечаются надгробием (DELETED), чтобы не разрывать цепочки проб других ключей
+# CompactHashTable хранит записи как dict в CPython: плотные массивы хешей, ключей и значений в порядке вставки
+# и маленький массив индексов с номерами записей, поэтому хеши не пересчитываются при resize
+# Обе таблицы поддерживают протокол отображения (table[key], del table[key], in, len, итерация)
+# insert_many и get_many работают с пачками ключей (таблица расширяется один раз), stats() показывает
+# заполненность, гистограмму длин цепочек проб, число и время изменений размера
+# ShardedHashTable - потокобезопасная таблица из N независимых сегментов HashTable, у каждого своя блокировка и свой resize
+# LRUCache - ограниченный кэш поверх HashTable с вытеснением давно неиспользованных элементов и временем жизни (ttl)
+# DiskHashTable - таблица в файле: слоты отображаются в память через mmap, ключи и значения лежат в отдельной куче
+# Код для проверки таблицы позволяет пользователю добавлять или удалять значения и видеть текущую таблицу после каждого действия.
+# Если при запуске передан путь к файлу (python hash_hash.py table.db), таблица хранится в нем и сохраняется между запусками
 # Ключи и значения в виде строк
+import gc
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+
+DELETED = object()  # Надгробие: ячейка освобождена, но поиск должен идти дальше по цепочке проб
+EMPTY = -1  # Пустая ячейка массива индексов CompactHashTable
+DUMMY = -2  # Надгробие в массиве индексов CompactHashTable
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15  # Нечетная константа 2^64 / золотое сечение для перемешивания хеша
+PREV, NEXT, KEY, VALUE, EXPIRES = 0, 1, 2, 3, 4  # Поля узла списка LRUCache
+
+# Формат файлов DiskHashTable
+DISK_MAGIC = b"HASHIDX1"
+DISK_HEADER = 4096  # Заголовок занимает первую страницу файла слотов (и кучи при создании)
+DISK_META = struct.Struct("<8sQQQQQ")  # Метка, log2 размера, элементы, занятые слоты, конец кучи, мусор в куче
+DISK_SLOT = struct.Struct("<QQ")  # Слот: 64-битный хеш ключа и смещение записи в куче
+DISK_RECORD = struct.Struct("<II")  # Запись кучи: длины ключа и значения в байтах, затем сами байты
+SLOT_EMPTY = 0  # Смещение пустого слота
+SLOT_DELETED = 1  # Смещение надгробия
+HEAP_COMPACT_MIN = 1 << 20  # Куча меньше этого размера не сжимается, даже если в ней в основном мусор
+
 
 class HashTable:
-    def __init__(self, initial_size=8):
-        self.size = initial_size  # Начальный размер таблицы
+    def __init__(self, initial_size=8, incremental=False, rehash_batch=8, max_load=0.7, min_load=0.3):
+        self.bits = max(3, (initial_size - 1).bit_length())  # Размер таблицы - степень двойки, не меньше 8
+        self.size = 1 << self.bits  # Начальный размер таблицы
         self.count = 0  # Счетчик элементов в таблице
+        self.used = 0  # Занятые ячейки: элементы и надгробия
         self.table = [None] * self.size  # Таблица инициализируется пустыми значениями
+        # Постепенное изменение размера (как dict в Redis): старая таблица хранится рядом с новой
+        # и переносится по rehash_batch элементов при каждой операции, поэтому ни одна вставка не платит за O(n)
+        self.incremental = incremental
+        self.rehash_batch = rehash_batch
+        self.old = None  # Старая таблица, пока идет перенос
+        self.old_bits = 0  # Размер старой таблицы (степень двойки)
+        self.old_idx = 0  # Первая еще не перенесенная ячейка старой таблицы
+        self.max_load = max_load  # Порог расширения (элементы вместе с надгробиями)
+        self.min_load = min_load  # Порог уменьшения
+        self.resizes = 0  # Число изменений размера
+        self.resize_time = 0.0  # Время в resize и переносе старой таблицы, с
+
+    def _hash(self, key):
+        # Полный 64-битный хеш ключа, перемешанный умножением на нечетную константу,
+        # чтобы в индекс и шаг попадали все разряды hash(key)
+        return (hash(key) * GOLDEN) & MASK64
+
+    def hash1(self, h, bits):
+        # Первая хеш-функция: начальный индекс из старших разрядов перемешанного хеша
+        return h >> (64 - bits)
+
+    def hash2(self, h, bits):
+        # Вторая хеш-функция: шаг при коллизиях из младших разрядов.
+        # Шаг нечетный, а размер - степень двойки, поэтому пробы обходят все ячейки
+        return (h & ((1 << bits) - 1)) | 1
+
+    def _probe(self, table, bits, key, h):
+        # Индекс ячейки с ключом key в таблице table или None
+        idx = self.hash1(h, bits)
+        step = self.hash2(h, bits)
+        mask = (1 << bits) - 1
+        while (item := table[idx]) is not None:
+            if item is not DELETED and item[0] == key:
+                return idx
+            idx = (idx + step) & mask
+        return None
+
+    def _find(self, key):
+        # Таблица и индекс ячейки с ключом key: сначала в новой таблице, затем в старой, или (None, None)
+        h = self._hash(key)
+        idx = self._probe(self.table, self.bits, key, h)
+        if idx is not None:
+            return self.table, idx
+        if self.old is not None:
+            idx = self._probe(self.old, self.old_bits, key, h)
+            if idx is not None:
+                return self.old, idx
+        return None, None
 
-    def hash1(self, key):
-        # Первая хеш-функция, возвращающая индекс в пределах 256
-        return hash(key) % 256
+    def _place(self, item):
+        # Перенос элемента из старой таблицы в первую свободную ячейку новой (ключа в новой таблице заведомо нет)
+        h = (hash(item[0]) * GOLDEN) & MASK64  # То же, что _hash, hash1 и hash2, без вызовов методов
+        mask = self.size - 1
+        idx = h >> (64 - self.bits)
+        step = (h & mask) | 1
+        while (slot := self.table[idx]) is not None and slot is not DELETED:
+            idx = (idx + step) & mask
+        if slot is None:
+            self.used += 1
+        self.table[idx] = item
 
-    def hash2(self, key):
-        # Вторая хеш-функция для определения шага при коллизиях
-        return 1 + (hash(key) % 128)
+    def _rehash_step(self, batch=None):
+        # Переносит из старой таблицы не больше batch элементов, просматривая не больше 10 * batch ячеек
+        start = time.perf_counter()
+        batch = batch or self.rehash_batch
+        old, idx = self.old, self.old_idx
+        end = min(len(old), idx + 10 * batch)
+        moved = 0
+        while idx < end and moved < batch:
+            item = old[idx]
+            if item is not None and item is not DELETED:
+                self._place(item)
+                old[idx] = DELETED  # Не None, чтобы не разорвать цепочки проб еще не перенесенных ключей
+                moved += 1
+            idx += 1
+        self.old_idx = idx
+        if idx == len(old):
+            self.old = None  # Перенос закончен
+        self.resize_time += time.perf_counter() - start
+
+    def _finish_rehash(self):
+        # Завершает перенос старой таблицы целиком
+        while self.old is not None:
+            self._rehash_step(len(self.old))
 
     def insert(self, key, value):
         # Добавление нового элемента в таблицу
-        if self.count / self.size > 0.7:  # Если таблица заполнена более чем на 70%, расширяем её
-            self.resize(self.size * 2)
+        if self.old is not None:
+            self._rehash_step()
+        if (self.used + 1) / self.size > self.max_load:  # Если таблица вместе с надгробиями заполнена более чем на 70%
+            # Расширяем её, а если места занимают в основном надгробия - перестраиваем с тем же размером
+            self.resize(self.size * 2 if self.count * 2 >= self.size else self.size)
 
-        idx = self.hash1(key) % self.size  # Основной индекс по первой хеш-функции
-        step = self.hash2(key)  # Шаг при коллизиях по второй хеш-функции
+        h = self._hash(key)
+        idx = self.hash1(h, self.bits)  # Основной индекс по первой хеш-функции
+        step = self.hash2(h, self.bits)  # Шаг при коллизиях по второй хеш-функции
+        free = None  # Первое надгробие на пути - туда можно вставить новый элемент
 
-        # Вставка с использованием двойного хеширования при возникновении коллизий
-        while self.table[idx] is not None:
-            if self.table[idx][0] == key:
+        # Поиск ключа с использованием двойного хеширования
+        while (item := self.table[idx]) is not None:
+            if item is DELETED:
+                if free is None:
+                    free = idx
+            elif item[0] == key:
                 self.table[idx] = (key, value)  # Обновляем значение, если ключ уже существует
                 return
-            idx = (idx + step) % self.size  # Переходим к новому индексу
+            idx = (idx + step) & (self.size - 1)  # Переходим к новому индексу
+
+        if self.old is not None:  # Ключ еще в старой таблице - он переезжает в новую
+            old_idx = self._probe(self.old, self.old_bits, key, h)
+            if old_idx is not None:
+                self.old[old_idx] = DELETED
+                self.count -= 1
 
         # Вставляем новую пару ключ-значение
-        self.table[idx] = (key, value)
+        if free is None:
+            self.used += 1  # Занимаем пустую ячейку, надгробие занятым уже считается
+            free = idx
+        self.table[free] = (key, value)
         self.count += 1
 
-    def get(self, key):
+    def get(self, key, default=None):
         # Получение значения по ключу
-        idx = self.hash1(key) % self.size
-        step = self.hash2(key)
-
-        # Поиск элемента по ключу
-        while self.table[idx] is not None:
-            if self.table[idx][0] == key:
-                return self.table[idx][1]
-            idx = (idx + step) % self.size
-        return None
+        if self.old is not None:
+            self._rehash_step()
+        table, idx = self._find(key)
+        return default if table is None else table[idx][1]
 
     def remove(self, key):
         # Удаление элемента по ключу
-        idx = self.hash1(key) % self.size
-        step = self.hash2(key)
-
-        # Поиск и удаление элемента
-        while self.table[idx] is not None:
-            if self.table[idx][0] == key:
-                self.table[idx] = None  # Удаление элемента
-                self.count -= 1
-                if self.count / self.size < 0.3 and self.size > 8:
-                    self.resize(self.size // 2)  # Уменьшаем таблицу, если заполненность менее 30%
-                return
-            idx = (idx + step) % self.size
+        if self.old is not None:
+            self._rehash_step()
+        table, idx = self._find(key)
+        if table is None:
+            return
+        table[idx] = DELETED  # Надгробие сохраняет цепочку проб для других ключей
+        self.count -= 1
+        if self.old is None and self.count / self.size < self.min_load and self.size > 8:
+            self.resize(self.size // 2)  # Уменьшаем таблицу, если заполненность менее 30%
 
     def resize(self, new_size):
-        # Изменение размера таблицы и перехеширование всех элементов
-        old_table = self.table
+        # Изменение размера таблицы и перехеширование всех элементов, надгробия при этом отбрасываются.
+        # В режиме incremental старая таблица только откладывается, элементы переносятся при следующих операциях
+        if self.old is not None:
+            self._finish_rehash()
+        start = time.perf_counter()
+        self.resizes += 1
+        old_table, old_bits = self.table, self.bits
+        self.bits = new_size.bit_length() - 1
         self.size = new_size
-        self.count = 0
+        self.used = 0
         self.table = [None] * self.size
+        if self.incremental:
+            self.old, self.old_bits, self.old_idx = old_table, old_bits, 0
+        else:
+            self.count = 0
+            for item in old_table:
+                if item is not None and item is not DELETED:
+                    self.insert(*item)  # Повторная вставка всех элементов
+        self.resize_time += time.perf_counter() - start
+
+    def insert_many(self, pairs):
+        # Вставка пачки пар (ключ, значение). Таблица заранее расширяется один раз под count + len(pairs)
+        # элементов вместо log2(n) последовательных удвоений с перехешированием
+        pairs = list(pairs)
+        if self.old is not None:
+            self._finish_rehash()
+        if (self.used + len(pairs)) / self.size > self.max_load:
+            needed = self.count + len(pairs)
+            new_size = self.size
+            while needed / new_size > self.max_load:
+                new_size *= 2
+            self.resize(new_size)
+            if self.old is not None:
+                self._finish_rehash()  # Пачку вставляем в одну таблицу, без переноса на каждой вставке
+        for key, value in pairs:
+            self.insert(key, value)
+
+    def get_many(self, keys, default=None):
+        # Список значений для пачки ключей. Перенос старой таблицы завершается один раз,
+        # после чего пробирование идет по одной таблице без вызовов методов на каждый ключ
+        if self.old is not None:
+            self._finish_rehash()
+        table, shift, mask = self.table, 64 - self.bits, self.size - 1
+        values = []
+        for key in keys:
+            h = (hash(key) * GOLDEN) & MASK64
+            idx = h >> shift
+            step = (h & mask) | 1
+            value = default
+            while (item := table[idx]) is not None:
+                if item is not DELETED and item[0] == key:
+                    value = item[1]
+                    break
+                idx = (idx + step) & mask
+            values.append(value)
+        return values
+
+    def stats(self):
+        # Статистика таблицы. Гистограмма длин проб (сколько ячеек просматривает поиск каждого ключа:
+        # 1 - ключ на своем основном месте) считается по запросу полным проходом по таблице
+        histogram = {}
+        for table, bits in ((self.table, self.bits), (self.old, self.old_bits)):
+            if table is None:
+                continue
+            mask = (1 << bits) - 1
+            for item in table:
+                if item is None or item is DELETED:
+                    continue
+                h = self._hash(item[0])
+                idx, step, length = self.hash1(h, bits), self.hash2(h, bits), 1
+                while table[idx] is not item:
+                    idx = (idx + step) & mask
+                    length += 1
+                histogram[length] = histogram.get(length, 0) + 1
+        probes = sum(length * number for length, number in histogram.items())
+        return {
+            "size": self.size,
+            "count": self.count,
+            "load_factor": self.count / self.size,
+            "tombstones": self.used - self.count if self.old is None else None,  # Пока идет перенос, счетчики смешаны
+            "probe_histogram": dict(sorted(histogram.items())),
+            "avg_probe": probes / self.count if self.count else 0.0,
+            "max_probe": max(histogram, default=0),
+            "resizes": self.resizes,
+            "resize_time": self.resize_time,
+        }
+
+    def __str__(self):
+        # Компактный вывод заполненных ячеек таблицы (и старой таблицы, пока идет перенос)
+        text = {idx: item for idx, item in enumerate(self.table) if item is not None and item is not DELETED}.__str__()
+        if self.old is not None:
+            text += " + старая таблица: " + {
+                idx: item for idx, item in enumerate(self.old) if item is not None and item is not DELETED}.__str__()
+        return text
+
+    # Протокол отображения, чтобы таблицу можно было использовать вместо dict
+    def __getitem__(self, key):
+        if self.old is not None:
+            self._rehash_step()
+        table, idx = self._find(key)
+        if table is None:
+            raise KeyError(key)
+        return table[idx][1]
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if self._find(key)[0] is None:
+            raise KeyError(key)
+        self.remove(key)
+
+    def __contains__(self, key):
+        return self._find(key)[0] is not None
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        # Пары (ключ, значение) в порядке ячеек таблицы
+        for table in (self.table, self.old):
+            if table is not None:
+                for item in table:
+                    if item is not None and item is not DELETED:
+                        yield item
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+
+def _index_typecode(size):
+    # Самый узкий тип array, в который помещаются номера записей таблицы размера size (и -1, -2)
+    for typecode in ("b", "h", "i"):
+        if size <= 1 << (8 * array(typecode).itemsize - 1):
+            return typecode
+    return "q"
+
+
+class CompactHashTable:
+    # Компактная хеш-таблица в духе dict из CPython. Записи лежат плотно в порядке вставки в трех
+    # параллельных массивах: hashes (перемешанный 64-битный хеш в array "Q"), keys и values.
+    # Открытая адресация с двойным хешированием идет по массиву indices, где хранятся только номера
+    # записей минимальной ширины (1-8 байт), EMPTY или DUMMY. Удаленная запись оставляет дыру (DELETED),
+    # дыры убираются при resize. Хеши сохранены, поэтому resize перестраивает индекс без вызова hash()
+    def __init__(self, initial_size=8):
+        self.bits = max(3, (initial_size - 1).bit_length())  # Размер индекса - степень двойки, не меньше 8
+        self.size = 1 << self.bits  # Размер массива индексов
+        self.count = 0  # Счетчик элементов в таблице
+        self.indices = array(_index_typecode(self.size), [EMPTY]) * self.size
+        self.hashes = array("Q")  # Сохраненные хеши записей
+        self.keys = []  # Ключи записей, DELETED - удаленная запись
+        self.values = []  # Значения записей
+
+    def _hash(self, key):
+        # Полный 64-битный хеш ключа, перемешанный так же, как в HashTable
+        return (hash(key) * GOLDEN) & MASK64
+
+    def _lookup(self, key, h):
+        # Ячейка индекса и номер записи с ключом key.
+        # Если ключа нет - первая ячейка на пути, куда его можно вставить, и -1
+        mask = self.size - 1
+        idx = h >> (64 - self.bits)  # Начальный индекс - старшие разряды хеша
+        step = (h & mask) | 1  # Нечетный шаг - младшие разряды
+        free = -1
+        while (entry := self.indices[idx]) != EMPTY:
+            if entry == DUMMY:
+                if free < 0:
+                    free = idx
+            elif self.hashes[entry] == h and self.keys[entry] == key:  # Сначала сравниваем сохраненные хеши
+                return idx, entry
+            idx = (idx + step) & mask
+        return (idx if free < 0 else free), -1
+
+    def insert(self, key, value):
+        # Добавление нового элемента или обновление значения
+        h = self._hash(key)
+        idx, entry = self._lookup(key, h)
+        if entry >= 0:
+            self.values[entry] = value
+            return
+        if len(self.keys) + 1 > 0.7 * self.size:  # Записи вместе с дырами заполнили индекс более чем на 70%
+            self.resize(self.size * 2 if self.count * 2 >= self.size else self.size)
+            idx, _ = self._lookup(key, h)
+        self.indices[idx] = len(self.keys)
+        self.hashes.append(h)
+        self.keys.append(key)
+        self.values.append(value)
+        self.count += 1
+
+    def get(self, key, default=None):
+        # Получение значения по ключу
+        _, entry = self._lookup(key, self._hash(key))
+        return default if entry < 0 else self.values[entry]
+
+    def remove(self, key):
+        # Удаление элемента по ключу
+        idx, entry = self._lookup(key, self._hash(key))
+        if entry < 0:
+            return
+        self.indices[idx] = DUMMY
+        self.keys[entry] = DELETED
+        self.values[entry] = None
+        self.count -= 1
+        if self.count / self.size < 0.3 and self.size > 8:
+            self.resize(self.size // 2)  # Уменьшаем таблицу, если заполненность менее 30%
+
+    def resize(self, new_size):
+        # Убирает дыры из плотных массивов и строит новый индекс по сохраненным хешам
+        if self.count != len(self.keys):
+            live = [entry for entry, key in enumerate(self.keys) if key is not DELETED]
+            self.hashes = array("Q", [self.hashes[entry] for entry in live])
+            self.keys = [self.keys[entry] for entry in live]
+            self.values = [self.values[entry] for entry in live]
+        self.bits = new_size.bit_length() - 1
+        self.size = new_size
+        self.indices = indices = array(_index_typecode(new_size), [EMPTY]) * new_size
+        mask, shift = new_size - 1, 64 - self.bits
+        for entry, h in enumerate(self.hashes):
+            idx = h >> shift
+            step = (h & mask) | 1
+            while indices[idx] != EMPTY:
+                idx = (idx + step) & mask
+            indices[idx] = entry
+
+    def __str__(self):
+        # Вывод элементов в порядке вставки
+        return dict(self.items()).__str__()
+
+    # Протокол отображения, чтобы таблицу можно было использовать вместо dict
+    def __getitem__(self, key):
+        _, entry = self._lookup(key, self._hash(key))
+        if entry < 0:
+            raise KeyError(key)
+        return self.values[entry]
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.remove(key)
+
+    def __contains__(self, key):
+        return self._lookup(key, self._hash(key))[1] >= 0
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        # Пары (ключ, значение) в порядке вставки
+        for key, value in zip(self.keys, self.values):
+            if key is not DELETED:
+                yield key, value
+
+    def __iter__(self):
+        for key in self.keys:
+            if key is not DELETED:
+                yield key
+
+
+class ShardedHashTable:
+    # Потокобезопасная таблица: ключ по hash(key) % shards попадает в один из независимых сегментов HashTable.
+    # У каждого сегмента своя блокировка и свое изменение размера, поэтому потоки, работающие с разными
+    # сегментами, не ждут друг друга, а resize одного сегмента не останавливает остальные.
+    # Блокировка берется и на чтение: get в постепенном режиме переносит элементы старой таблицы
+    def __init__(self, shards=16, initial_size=8, incremental=False, rehash_batch=8):
+        per_shard = max(8, initial_size // shards)
+        self.shards = [HashTable(per_shard, incremental, rehash_batch) for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard(self, key):
+        # Номер сегмента для ключа. Берем остаток от исходного hash(key), а не старшие разряды перемешанного хеша:
+        # по ним HashTable выбирает ячейку внутри сегмента, и ключи сегмента заняли бы лишь часть его ячеек
+        return hash(key) % len(self.shards)
+
+    def insert(self, key, value):
+        # Добавление нового элемента или обновление значения
+        i = self._shard(key)
+        with self.locks[i]:
+            self.shards[i].insert(key, value)
+
+    def get(self, key, default=None):
+        # Получение значения по ключу
+        i = self._shard(key)
+        with self.locks[i]:
+            return self.shards[i].get(key, default)
+
+    def remove(self, key):
+        # Удаление элемента по ключу
+        i = self._shard(key)
+        with self.locks[i]:
+            self.shards[i].remove(key)
+
+    def __str__(self):
+        return dict(self.items()).__str__()
+
+    def __getitem__(self, key):
+        i = self._shard(key)
+        with self.locks[i]:
+            return self.shards[i][key]
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        i = self._shard(key)
+        with self.locks[i]:
+            del self.shards[i][key]
+
+    def __contains__(self, key):
+        i = self._shard(key)
+        with self.locks[i]:
+            return key in self.shards[i]
 
-        for item in old_table:
-            if item is not None:
-                self.insert(*item)  # Повторная вставка всех элементов
+    def __len__(self):
+        total = 0
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                total += len(shard)
+        return total
+
+    def items(self):
+        # Снимок каждого сегмента берется под его блокировкой, поэтому итерация не падает
+        # при параллельных изменениях, но и не является снимком всей таблицы на один момент
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                snapshot = list(shard.items())
+            yield from snapshot
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+
+class LRUCache:
+    # Ограниченный кэш поверх HashTable: не больше max_entries элементов, при переполнении вытесняется
+    # давно неиспользованный (LRU). Таблица хранит ключ -> узел двусвязного кольцевого списка
+    # [prev, next, key, value, expires] с фиктивным корнем, как functools.lru_cache, поэтому поиск, перенос
+    # в начало списка и вытеснение - O(1) и в худшем случае (перестройка таблицы постепенная). Если задан ttl (секунды), устаревший элемент считается промахом
+    # и удаляется при обращении к нему или при вытеснении
+    def __init__(self, max_entries=1024, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl  # Время жизни по умолчанию, None - без ограничения
+        self.clock = clock
+        # Каждое вытеснение оставляет в таблице надгробие, и при постоянной смене ключей таблица периодически
+        # перестраивается. Размер не меньше 2 * max_entries: элементов всегда меньше половины ячеек, поэтому
+        # перестройка идет с тем же размером и таблица не растет; incremental переносит элементы понемногу
+        # при каждой операции, а не за одну вставку, и min_load=0 отключает уменьшение
+        self.table = HashTable(max(8, 2 * max_entries), incremental=True, min_load=0)
+        self.root = root = []  # Корень списка: root[NEXT] - самый свежий узел, root[PREV] - самый старый
+        root[:] = [root, root, None, None, None]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Вытеснены из-за переполнения
+        self.expirations = 0  # Удалены по истечении ttl
+
+    def _unlink(self, node):
+        prev, next = node[PREV], node[NEXT]
+        prev[NEXT] = next
+        next[PREV] = prev
+
+    def _push_front(self, node):
+        root = self.root
+        first = root[NEXT]
+        node[PREV], node[NEXT] = root, first
+        first[PREV] = root[NEXT] = node
+
+    def _drop(self, node):
+        # Удаляет узел из списка и таблицы
+        self._unlink(node)
+        self.table.remove(node[KEY])
+
+    def get(self, key, default=None):
+        # Значение по ключу; попадание делает элемент самым свежим
+        node = self.table.get(key)
+        if node is None:
+            self.misses += 1
+            return default
+        if node[EXPIRES] is not None and node[EXPIRES] <= self.clock():
+            self._drop(node)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._unlink(node)
+        self._push_front(node)
+        self.hits += 1
+        return node[VALUE]
+
+    def put(self, key, value, ttl=None):
+        # Добавление или обновление элемента, ttl переопределяет время жизни по умолчанию
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else self.clock() + ttl
+        node = self.table.get(key)
+        if node is not None:
+            node[VALUE], node[EXPIRES] = value, expires
+            self._unlink(node)
+            self._push_front(node)
+            return
+        if self.table.count >= self.max_entries:
+            oldest = self.root[PREV]
+            self._drop(oldest)
+            if oldest[EXPIRES] is not None and oldest[EXPIRES] <= self.clock():
+                self.expirations += 1
+            else:
+                self.evictions += 1
+        node = [None, None, key, value, expires]
+        self._push_front(node)
+        self.table.insert(key, node)
+
+    def remove(self, key):
+        # Удаление элемента по ключу
+        node = self.table.get(key)
+        if node is not None:
+            self._drop(node)
+
+    def stats(self):
+        # Счетчики попаданий, промахов и вытеснений
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.table.count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def __len__(self):
+        # Число элементов вместе с устаревшими, которые еще не удалены
+        return self.table.count
+
+    def __contains__(self, key):
+        # Проверка без изменения порядка вытеснения и счетчиков
+        node = self.table.get(key)
+        return node is not None and (node[EXPIRES] is None or node[EXPIRES] > self.clock())
 
     def __str__(self):
-        # Компактный вывод заполненных ячеек таблицы
-        return {idx: item for idx, item in enumerate(self.table) if item is not None}.__str__()
+        # Элементы от самого свежего к самому старому
+        items, node = {}, self.root[NEXT]
+        while node is not self.root:
+            items[node[KEY]] = node[VALUE]
+            node = node[NEXT]
+        return items.__str__()
+
+
+class DiskHashTable:
+    # Хеш-таблица в файле: массив слотов фиксированной ширины (хеш ключа и смещение записи) отображается
+    # в память через mmap, а ключи и значения лежат отдельно в куче - файле path + ".heap", куда записи
+    # (длины ключа и значения, затем их байты в utf-8) только дописываются. При открытии читается один заголовок,
+    # а поиск затрагивает только страницу своих слотов и страницу найденной записи: запись читается,
+    # лишь когда совпал весь 64-битный хеш. Хеш стабильный (blake2b), потому что hash(str) меняется между запусками.
+    # Обновление и удаление оставляют в куче мусор; когда его больше половины кучи, куча переписывается (при resize).
+    # Изменения записываются в отображенную память сразу, flush/close сбрасывают ее на диск. Журнала нет,
+    # поэтому аварийное завершение посреди операции может повредить файлы
+    def __init__(self, path, initial_size=1024, max_load=0.7):
+        self.path = path
+        self.max_load = max_load  # Порог расширения (элементы вместе с надгробиями)
+        self.resizes = 0  # Число изменений размера за время работы с файлом
+        self.resize_time = 0.0
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        self._heap_file = open(path + ".heap", "r+b" if exists else "w+b")
+        if not exists:
+            bits = max(3, (initial_size - 1).bit_length())
+            self._file.truncate(DISK_HEADER + (DISK_SLOT.size << bits))  # Нулевые слоты - пустые
+            self._heap_file.truncate(DISK_HEADER)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._heap = mmap.mmap(self._heap_file.fileno(), 0)
+        if exists:
+            magic, self.bits, self.count, self.used, self.heap_end, self.garbage = DISK_META.unpack_from(self._mm, 0)
+            if magic != DISK_MAGIC:
+                self.close()
+                raise ValueError(f"Файл {path} не является файлом DiskHashTable")
+        else:
+            self.bits, self.count, self.used, self.heap_end, self.garbage = bits, 0, 0, len(DISK_MAGIC), 0
+            self._heap[:len(DISK_MAGIC)] = DISK_MAGIC  # Смещения 0 и 1 в куче заняты, поэтому служат метками слотов
+            self._write_meta()
+        self.size = 1 << self.bits
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        # Сбрасывает отображенные страницы на диск
+        self._write_meta()
+        self._mm.flush()
+        self._heap.flush()
+
+    def close(self):
+        # Сохраняет таблицу и закрывает файлы
+        if not self._mm.closed:
+            self.flush()
+            self._mm.close()
+            self._heap.close()
+            self._file.close()
+            self._heap_file.close()
+
+    def _write_meta(self):
+        DISK_META.pack_into(self._mm, 0, DISK_MAGIC, self.bits, self.count, self.used, self.heap_end, self.garbage)
+
+    def _hash(self, data):
+        # Стабильный 64-битный хеш байтов ключа: индекс в файле должен находиться и после перезапуска,
+        # а hash(str) в Python зависит от PYTHONHASHSEED
+        return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+    def _record(self, offset):
+        # Байты ключа и значения записи кучи по смещению
+        key_len, value_len = DISK_RECORD.unpack_from(self._heap, offset)
+        start = offset + DISK_RECORD.size
+        return self._heap[start:start + key_len], self._heap[start + key_len:start + key_len + value_len]
+
+    def _record_size(self, offset):
+        key_len, value_len = DISK_RECORD.unpack_from(self._heap, offset)
+        return DISK_RECORD.size + key_len + value_len
+
+    def _append(self, data, value):
+        # Дописывает запись в кучу и возвращает ее смещение
+        offset = self.heap_end
+        self.heap_end += DISK_RECORD.size + len(data) + len(value)
+        if self.heap_end > len(self._heap):  # Увеличиваем кучу вдвое и отображаем заново
+            new_size = max(len(self._heap) * 2, self.heap_end)
+            self._heap.close()
+            self._heap_file.truncate(new_size)
+            self._heap = mmap.mmap(self._heap_file.fileno(), 0)
+        DISK_RECORD.pack_into(self._heap, offset, len(data), len(value))
+        start = offset + DISK_RECORD.size
+        self._heap[start:self.heap_end] = data + value
+        return offset
+
+    def _lookup(self, data, h):
+        # Номер слота с ключом data и смещение его записи в куче.
+        # Если ключа нет - первый слот на пути, куда его можно вставить, и None
+        mask = self.size - 1
+        idx = h >> (64 - self.bits)  # Начальный индекс - старшие разряды хеша
+        step = (h & mask) | 1  # Нечетный шаг - младшие разряды
+        free = None
+        while True:
+            slot_hash, offset = DISK_SLOT.unpack_from(self._mm, DISK_HEADER + idx * DISK_SLOT.size)
+            if offset == SLOT_EMPTY:
+                return (idx if free is None else free), None
+            if offset == SLOT_DELETED:
+                if free is None:
+                    free = idx
+            elif slot_hash == h and self._record(offset)[0] == data:
+                return idx, offset
+            idx = (idx + step) & mask
+
+    def _slots(self, mm=None, size=None):
+        # Занятые слоты (номер, хеш, смещение), файл читается кусками по 4096 слотов
+        mm, size = mm or self._mm, size or self.size
+        chunk = 4096
+        for first in range(0, size, chunk):
+            start = DISK_HEADER + first * DISK_SLOT.size
+            block = mm[start:start + min(chunk, size - first) * DISK_SLOT.size]
+            for idx, (h, offset) in enumerate(DISK_SLOT.iter_unpack(block), first):
+                if offset > SLOT_DELETED:
+                    yield idx, h, offset
+
+    def insert(self, key, value):
+        # Добавление нового элемента или обновление значения
+        data = key.encode()
+        h = self._hash(data)
+        idx, offset = self._lookup(data, h)
+        if offset is not None:
+            self.garbage += self._record_size(offset)  # Старая запись остается в куче мусором
+        else:
+            if (self.used + 1) / self.size > self.max_load:
+                self.resize(self.size * 2 if self.count * 2 >= self.size else self.size)
+                idx, _ = self._lookup(data, h)
+            if DISK_SLOT.unpack_from(self._mm, DISK_HEADER + idx * DISK_SLOT.size)[1] == SLOT_EMPTY:
+                self.used += 1  # Занимаем пустой слот, надгробие занятым уже считается
+            self.count += 1
+        DISK_SLOT.pack_into(self._mm, DISK_HEADER + idx * DISK_SLOT.size, h, self._append(data, value.encode()))
+        if self.garbage * 2 > self.heap_end > HEAP_COMPACT_MIN:
+            self.resize(self.size)
+
+    def get(self, key, default=None):
+        # Получение значения по ключу
+        data = key.encode()
+        _, offset = self._lookup(data, self._hash(data))
+        return default if offset is None else self._record(offset)[1].decode()
+
+    def remove(self, key):
+        # Удаление элемента по ключу. Размер файла слотов не уменьшается
+        data = key.encode()
+        idx, offset = self._lookup(data, self._hash(data))
+        if offset is None:
+            return
+        DISK_SLOT.pack_into(self._mm, DISK_HEADER + idx * DISK_SLOT.size, 0, SLOT_DELETED)
+        self.garbage += self._record_size(offset)
+        self.count -= 1
+        if self.garbage * 2 > self.heap_end > HEAP_COMPACT_MIN:
+            self.resize(self.size)
+
+    def resize(self, new_size):
+        # Строит новый файл слотов по сохраненным хешам (ключи не читаются и не хешируются заново)
+        # и подменяет им старый. Если мусора в куче больше половины, куча тоже переписывается без него
+        start = time.perf_counter()
+        self.resizes += 1
+        compact = self.garbage * 2 > self.heap_end
+        new_bits = new_size.bit_length() - 1
+        with open(self.path + ".tmp", "w+b") as file:
+            file.truncate(DISK_HEADER + (DISK_SLOT.size << new_bits))
+            mm = mmap.mmap(file.fileno(), 0)
+            if compact:
+                heap_file = open(self.path + ".heap.tmp", "w+b")
+                heap_file.truncate(max(DISK_HEADER, self.heap_end - self.garbage))
+                heap = mmap.mmap(heap_file.fileno(), 0)
+                heap[:len(DISK_MAGIC)] = DISK_MAGIC
+                heap_end = len(DISK_MAGIC)
+            mask, shift = new_size - 1, 64 - new_bits
+            for _, h, offset in self._slots():
+                if compact:  # Переносим запись в новую кучу
+                    size = self._record_size(offset)
+                    heap[heap_end:heap_end + size] = self._heap[offset:offset + size]
+                    offset, heap_end = heap_end, heap_end + size
+                idx = h >> shift
+                step = (h & mask) | 1
+                while DISK_SLOT.unpack_from(mm, DISK_HEADER + idx * DISK_SLOT.size)[1] != SLOT_EMPTY:
+                    idx = (idx + step) & mask
+                DISK_SLOT.pack_into(mm, DISK_HEADER + idx * DISK_SLOT.size, h, offset)
+            self.bits, self.size, self.used = new_bits, new_size, self.count
+            # Windows не переименовывает открытый или отображенный файл, поэтому перед os.replace закрываются
+            # и новые файлы, и старые, а затем итоговые файлы открываются и отображаются заново
+            mm.flush()
+            mm.close()
+        self._mm.close()
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        if compact:
+            self.heap_end, self.garbage = heap_end, 0
+            heap.flush()
+            heap.close()
+            heap_file.close()
+            self._heap.close()
+            self._heap_file.close()
+            os.replace(self.path + ".heap.tmp", self.path + ".heap")
+            self._heap_file = open(self.path + ".heap", "r+b")
+            self._heap = mmap.mmap(self._heap_file.fileno(), 0)
+        self._write_meta()
+        self.resize_time += time.perf_counter() - start
+
+    def stats(self):
+        # Статистика в том же виде, что HashTable.stats
+        histogram = {}
+        mask = self.size - 1
+        for target, h, _ in self._slots():
+            idx, step, length = h >> (64 - self.bits), (h & mask) | 1, 1
+            while idx != target:
+                idx = (idx + step) & mask
+                length += 1
+            histogram[length] = histogram.get(length, 0) + 1
+        probes = sum(length * number for length, number in histogram.items())
+        return {
+            "size": self.size,
+            "count": self.count,
+            "load_factor": self.count / self.size,
+            "tombstones": self.used - self.count,
+            "probe_histogram": dict(sorted(histogram.items())),
+            "avg_probe": probes / self.count if self.count else 0.0,
+            "max_probe": max(histogram, default=0),
+            "resizes": self.resizes,
+            "resize_time": self.resize_time,
+        }
+
+    def __str__(self):
+        return dict(self.items()).__str__()
+
+    def __getitem__(self, key):
+        value = self.get(key, DELETED)
+        if value is DELETED:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.insert(key, value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.remove(key)
+
+    def __contains__(self, key):
+        data = key.encode()
+        return self._lookup(data, self._hash(data))[1] is not None
+
+    def __len__(self):
+        return self.count
+
+    def items(self):
+        # Пары (ключ, значение) в порядке слотов
+        for _, _, offset in self._slots():
+            key, value = self._record(offset)
+            yield key.decode(), value.decode()
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+
+def benchmark_lookup(sizes=(10**3, 10**4, 10**5, 10**6, 10**7), probes=10**5):
+    # Время поиска существующих и отсутствующих ключей при росте таблицы от 10^3 до 10^7 элементов.
+    # При хорошей хеш-функции и заполненности не выше 70% оно не должно расти с размером
+    print(f"{'элементов':>10} {'размер':>10} {'заполн.':>8} {'нс/get есть':>12} {'нс/get нет':>11}")
+    for n in sizes:
+        table = HashTable()
+        for key in range(n):
+            table.insert(key, key)
+        present = [random.randrange(n) for _ in range(probes)]
+        absent = [random.randrange(n, n * 2) for _ in range(probes)]
+        times = []
+        for keys in (present, absent):
+            start = time.perf_counter()
+            for key in keys:
+                table.get(key)
+            times.append((time.perf_counter() - start) / probes * 1e9)
+        print(f"{n:>10} {table.size:>10} {table.count / table.size:>8.2f} {times[0]:>12.0f} {times[1]:>11.0f}")
+
+
+def benchmark_resize_latency(n=10**6):
+    # Гистограмма задержек вставки при обычном и постепенном изменении размера.
+    # При обычном resize редкие вставки платят за перехеширование всей таблицы, что видно в хвосте распределения
+    for incremental in (False, True):
+        table = HashTable(incremental=incremental)
+        latencies = []
+        for key in range(n):
+            start = time.perf_counter_ns()
+            table.insert(key, key)
+            latencies.append(time.perf_counter_ns() - start)
+        latencies.sort()
+        percentiles = ", ".join(f"p{q * 100:g} {latencies[min(n - 1, int(n * q))] / 1000:.1f}"
+                                for q in (0.5, 0.99, 0.999, 0.9999))
+        print(f"{'постепенный' if incremental else 'обычный'} resize, {n} вставок (мкс): {percentiles}, "
+              f"max {latencies[-1] / 1000:.1f}, сумма {sum(latencies) / 1e9:.2f} с")
+        # Гистограмма по степеням двойки микросекунд
+        buckets = {}
+        for latency in latencies:
+            bucket = 1 << max(0, latency // 1000).bit_length()
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+        for bucket in sorted(buckets):
+            print(f"    < {bucket:>8} мкс: {buckets[bucket]:>9} {'#' * min(60, buckets[bucket] * 60 // n + 1)}")
+
+
+def benchmark_layouts(n=10**6):
+    # Память на элемент (без самих объектов ключей и значений), вставка и итерация
+    # для HashTable, CompactHashTable и встроенного dict
+    keys = [str(i) for i in range(n)]
+    print(f"{'таблица':>17} {'байт/элемент':>13} {'вставка, с':>11} {'итерация, мс':>13} {'items, мс':>10}")
+    for cls in (HashTable, CompactHashTable, dict):
+        tracemalloc.start()
+        table = cls()
+        for key in keys:
+            table[key] = key
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del table
+
+        start = time.perf_counter()  # Вставку меряем отдельно: tracemalloc сильно ее замедляет
+        table = cls()
+        for key in keys:
+            table[key] = key
+        insert_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in table:
+            pass
+        iter_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in table.items():
+            pass
+        items_time = time.perf_counter() - start
+        print(f"{cls.__name__:>17} {memory / n:>13.1f} {insert_time:>11.2f} {iter_time * 1e3:>13.1f} {items_time * 1e3:>10.1f}")
+        del table
+
+
+def print_stats(table):
+    # Вывод статистики таблицы с гистограммой длин проб
+    stats = table.stats()
+    print(f"размер {stats['size']}, элементов {stats['count']}, заполненность {stats['load_factor']:.2f}, "
+          f"надгробий {stats['tombstones']}, изменений размера {stats['resizes']} "
+          f"({stats['resize_time'] * 1e3:.1f} мс), проб в среднем {stats['avg_probe']:.2f}, максимум {stats['max_probe']}")
+    buckets = {}  # Длины до 8 выводятся как есть, длинный хвост - по степеням двойки
+    for length, number in stats["probe_histogram"].items():
+        label = str(length) if length <= 8 else f"{(1 << (length - 1).bit_length() - 1) + 1}-{1 << (length - 1).bit_length()}"
+        buckets[label] = buckets.get(label, 0) + number
+    for label, number in buckets.items():
+        print(f"    {label:>7} проб: {number:>9} {'#' * min(60, number * 60 // max(1, stats['count']) + 1)}")
+
+
+def benchmark_bulk(n=10**6, max_loads=(0.5, 0.7, 0.9)):
+    # Поштучные insert/get против insert_many/get_many и длины проб при разных порогах заполненности
+    keys = [str(i) for i in range(n)]
+    pairs = [(key, key) for key in keys]
+    table = HashTable()
+    start = time.perf_counter()
+    for key, value in pairs:
+        table.insert(key, value)
+    one_by_one = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in keys:
+        table.get(key)
+    get_time = time.perf_counter() - start
+    print(f"insert по одному: {one_by_one:.2f} с ({table.resizes} resize, {table.resize_time:.2f} с), "
+          f"get по одному: {get_time:.2f} с")
+
+    table = HashTable()
+    start = time.perf_counter()
+    table.insert_many(pairs)
+    many = time.perf_counter() - start
+    start = time.perf_counter()
+    table.get_many(keys)
+    get_many_time = time.perf_counter() - start
+    print(f"insert_many: {many:.2f} с ({table.resizes} resize, {table.resize_time:.2f} с), "
+          f"get_many: {get_many_time:.2f} с")
+
+    # Таблица фиксированного размера заполняется ровно до порога max_load: так видны цепочки проб,
+    # с которыми таблица живет перед расширением
+    size = 1 << (n.bit_length() - 1)
+    for max_load in max_loads:
+        table = HashTable(size, max_load=max_load)
+        table.insert_many(pairs[:int(size * max_load) - 1])
+        print(f"max_load {max_load}:")
+        print_stats(table)
+
+
+def benchmark_disk(n=10**6, probes=10**5):
+    # Построение DiskHashTable, время повторного открытия файла и поиск по открытому заново файлу
+    path = os.path.join(tempfile.mkdtemp(), "bench.hash")
+    start = time.perf_counter()
+    with DiskHashTable(path) as table:
+        for i in range(n):
+            table.insert(str(i), str(i))
+    print(f"DiskHashTable: вставка {n} ключей {time.perf_counter() - start:.2f} с, файлы "
+          f"{(os.path.getsize(path) + os.path.getsize(path + '.heap')) / n:.1f} байт на ключ")
+
+    start = time.perf_counter()
+    table = DiskHashTable(path)
+    print(f"DiskHashTable: открытие файла {(time.perf_counter() - start) * 1e3:.2f} мс, {len(table)} ключей")
+    keys = [str(random.randrange(n)) for _ in range(probes)]
+    start = time.perf_counter()
+    for key in keys:
+        table.get(key)
+    print(f"DiskHashTable: get {(time.perf_counter() - start) / probes * 1e6:.2f} мкс")
+    table.close()
+    for name in (path, path + ".heap"):
+        os.remove(name)
+    os.rmdir(os.path.dirname(path))
+
+
+def benchmark_cache(universe=10**5, requests=10**6, s=1.0, fractions=(0.01, 0.05, 0.1, 0.2)):
+    # Доля попаданий и время операции LRUCache при запросах с распределением Ципфа: ключ ранга k
+    # запрашивается с вероятностью ~ 1 / k^s. При промахе значение "вычисляется" и кладется в кэш
+    weights = [1 / rank ** s for rank in range(1, universe + 1)]
+    keys = random.choices(range(universe), weights, k=requests)
+    print(f"Ципф s={s}, {universe} ключей, {requests} запросов")
+    print(f"{'размер кэша':>12} {'попадания':>10} {'вытеснено':>10} {'мкс/запрос':>11}")
+    for fraction in fractions:
+        cache = LRUCache(int(universe * fraction))
+        start = time.perf_counter()
+        for key in keys:
+            if cache.get(key) is None:
+                cache.put(key, key)
+        elapsed = time.perf_counter() - start
+        stats = cache.stats()
+        print(f"{cache.max_entries:>12} {stats['hit_rate']:>10.1%} {stats['evictions']:>10} "
+              f"{elapsed / requests * 1e6:>11.2f}")
+
+    # Худшая задержка put при постоянной смене ключей: каждый put нового ключа вытесняет старый
+    # и оставляет надгробие, так что таблица кэша регулярно перестраивается. Сборщик мусора на время замера
+    # отключен, иначе в худшую задержку попадают его полные проходы по всем узлам кэша, а не работа таблицы
+    cache = LRUCache(universe)
+    latencies = [0.0] * (requests * 2)
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for key in range(requests * 2):
+            put_start = time.perf_counter()
+            cache.put(key, key)
+            latencies[key] = time.perf_counter() - put_start
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    latencies.sort()
+    print(f"смена ключей: {requests * 2} put в кэш на {universe}, {elapsed / len(latencies) * 1e6:.2f} мкс/put, "
+          f"p99.9 {latencies[int(len(latencies) * 0.999)] * 1e6:.0f} мкс, худший {latencies[-1] * 1e3:.2f} мс, "
+          f"перестроек таблицы {cache.table.resizes} ({cache.table.resize_time:.2f} с), ячеек {cache.table.size}")
+
+
+def benchmark_concurrent(thread_counts=(1, 2, 4, 8, 16), ops=400_000, keys=100_000, write_share=0.2):
+    # Пропускная способность ShardedHashTable на пуле потоков: ops операций (write_share вставок,
+    # остальное - get) делятся поровну между потоками. Одна блокировка на всю таблицу (shards=1)
+    # сравнивается с 16 сегментами. В CPython с GIL байт-код все равно выполняется по одному потоку,
+    # поэтому рост с числом потоков виден только на сборке без GIL (python3.13t и новее)
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'включен' if gil else 'выключен'}, ядер: {os.cpu_count()}")
+    print(f"{'потоков':>8} {'1 сегмент, оп/с':>16} {'16 сегментов, оп/с':>19}")
+    for threads in thread_counts:
+        row = []
+        for shards in (1, 16):
+            table = ShardedHashTable(shards, initial_size=keys * 2)
+            for key in range(keys):
+                table.insert(key, key)
+            per_thread = ops // threads
+
+            def worker(seed):
+                rng = random.Random(seed)
+                for _ in range(per_thread):
+                    key = rng.randrange(keys)
+                    if rng.random() < write_share:
+                        table.insert(key, seed)
+                    else:
+                        table.get(key)
+
+            with ThreadPoolExecutor(threads) as pool:
+                start = time.perf_counter()
+                for future in [pool.submit(worker, seed) for seed in range(threads)]:
+                    future.result()
+                elapsed = time.perf_counter() - start
+            row.append(per_thread * threads / elapsed)
+        print(f"{threads:>8} {row[0]:>16.0f} {row[1]:>19.0f}")
 
 
 # Код для проверки работы хеш-таблицы
-hash_table = HashTable()
+hash_table = DiskHashTable(sys.argv[1]) if len(sys.argv) > 1 else HashTable()
 
 while True:
-    action = input("Введите 'a' для добавления, 'r' для удаления или 's' для выхода: ").strip().lower()
-    
+    action = input("Введите 'a' для добавления, 'r' для удаления, 'i' для статистики, "
+                   "'b' для замера скорости или 's' для выхода: ").strip().lower()
+
     if action == "a":
         key = input("Введите ключ: ")
         value = input("Введите значение: ")
@@ -97,9 +1142,23 @@ while True:
         hash_table.remove(key)
         print("Текущая таблица:", hash_table)
 
+    elif action == "i":
+        print_stats(hash_table)
+
+    elif action == "b":
+        benchmark_lookup()
+        benchmark_resize_latency()
+        benchmark_layouts()
+        benchmark_bulk()
+        benchmark_disk()
+        benchmark_cache()
+        benchmark_concurrent()
+
     elif action == "s":
+        if isinstance(hash_table, DiskHashTable):
+            hash_table.close()
         print("Завершение работы.")
         break
 
     else:
-        print("Неверная команда. Введите 'a', 'r' или 's'.")
+        print("Неверная команда. Введите 'a', 'r', 'i', 'b' или 's'.")
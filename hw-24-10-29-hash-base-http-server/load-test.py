@@ -0,0 +1,185 @@
+# Нагрузочный тест для base-http-server.py
+# Для каждого режима из --modes запускает сервер (python base-http-server.py --mode ...), ждет, пока он начнет
+# принимать соединения, и нагружает каждый маршрут по очереди. Без --modes нагружает уже запущенный сервер.
+# Нагрузку создают --connections постоянных соединений (keep-alive), распределенных по --processes процессам,
+# чтобы клиент сам не упирался в GIL. Для каждого маршрута выводится число запросов в секунду и задержки p50/p99.
+# С --batch-records сравнивается загрузка записей по одной через /api/submit и пачками через /api/submit/batch
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base-http-server.py")
+TARGETS = [
+    "GET /",
+    "GET /api/data",
+    "GET /factorial?number=100",
+    "POST /api/submit",
+]
+SUBMIT_BODY = json.dumps({"key": {"username": "john_doe", "email": "john@example.com"}})
+
+
+def run_connection(host, port, target, duration):
+    # Одно соединение keep-alive: запросы подряд до истечения duration секунд, возвращает задержки в секундах
+    method, path = target.split(" ", 1)
+    body = SUBMIT_BODY if method == "POST" else None
+    headers = {"Content-Type": "application/json"} if body else {}
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while (start := time.perf_counter()) < deadline:
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()  # Сервер закрыл соединение - открываем новое при следующем запросе
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies, errors
+
+
+def run_process(host, port, target, duration, connections):
+    # Процесс клиента: connections соединений в отдельных потоках
+    with ThreadPoolExecutor(connections) as pool:
+        results = list(pool.map(lambda _: run_connection(host, port, target, duration), range(connections)))
+    return [latency for latencies, _ in results for latency in latencies], sum(errors for _, errors in results)
+
+
+def load(host, port, target, duration, connections, processes):
+    # Нагрузка на один маршрут: число запросов в секунду, p50 и p99 в миллисекундах, число ошибок
+    per_process = [connections // processes + (i < connections % processes) for i in range(processes)]
+    with ProcessPoolExecutor(processes) as pool:
+        futures = [pool.submit(run_process, host, port, target, duration, n) for n in per_process if n]
+        results = [future.result() for future in futures]
+    latencies = sorted(latency for process_latencies, _ in results for latency in process_latencies)
+    errors = sum(errors for _, errors in results)
+    if not latencies:
+        return 0.0, 0.0, 0.0, errors
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1e3
+    return len(latencies) / duration, percentile(0.5), percentile(0.99), errors
+
+
+def post(connection, path, body, content_type):
+    # POST по открытому соединению, возвращает разобранный JSON-ответ
+    connection.request("POST", path, body, {"Content-Type": content_type})
+    response = connection.getresponse()
+    data = response.read()
+    if response.status >= 400:
+        raise SystemExit(f"{path}: ответ {response.status} {data[:200]!r}")
+    return json.loads(data)
+
+
+def benchmark_batch(host, port, records, batch_size):
+    # Записей в секунду: по одной записи на запрос, пачки NDJSON и пачки-массивы JSON по batch_size записей.
+    # Одно соединение keep-alive, чтобы сравнивались накладные расходы на запрос, а не параллельность
+    lines = [json.dumps({"id": i, "username": f"user{i}", "email": f"user{i}@example.com"}) for i in range(records)]
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    print(f"{'способ':>24} {'записей/с':>10} {'запросов':>9} {'с':>7}")
+
+    start = time.perf_counter()
+    for line in lines:
+        post(connection, "/api/submit", line, "application/json")
+    elapsed = time.perf_counter() - start
+    print(f"{'по одной':>24} {records / elapsed:>10.0f} {records:>9} {elapsed:>7.2f}")
+
+    for name, content_type, encode in (
+        ("NDJSON", "application/x-ndjson", lambda batch: "\n".join(batch)),
+        ("JSON-массив", "application/json", lambda batch: "[" + ",".join(batch) + "]"),
+    ):
+        received = 0
+        start = time.perf_counter()
+        for first in range(0, records, batch_size):
+            received += post(connection, "/api/submit/batch", encode(lines[first:first + batch_size]).encode(),
+                             content_type)["received"]
+        elapsed = time.perf_counter() - start
+        assert received == records
+        requests = -(-records // batch_size)
+        print(f"{name + f' по {batch_size}':>24} {records / elapsed:>10.0f} {requests:>9} {elapsed:>7.2f}")
+    connection.close()
+
+
+def wait_for_port(host, port, timeout=15):
+    # Ждет, пока сервер начнет принимать соединения
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"Сервер на {host}:{port} не запустился за {timeout} с")
+
+
+def start_server(mode, args):
+    # Запускает base-http-server.py в отдельной группе процессов, чтобы потом остановить и его воркеры
+    command = [sys.executable, SERVER, "--mode", mode, "--host", args.host, "--port", str(args.port),
+               "--workers", str(args.workers), "--threads", str(args.threads)]
+    if os.name == "nt":
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    else:
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  start_new_session=True)
+    wait_for_port(args.host, args.port)
+    return server
+
+
+def stop_server(server):
+    if os.name == "nt":
+        server.terminate()
+    else:
+        os.killpg(server.pid, signal.SIGTERM)  # Встроенный сервер Flask с отладкой запускает дочерний процесс
+    server.wait()
+
+
+def report(mode, args):
+    # Таблица результатов для одного режима
+    print(f"режим {mode}: {args.connections} соединений, {args.processes} процессов клиента, {args.duration} с на маршрут")
+    print(f"{'маршрут':>28} {'запр/с':>9} {'p50, мс':>8} {'p99, мс':>8} {'ошибки':>7}")
+    for target in args.targets:
+        rps, p50, p99, errors = load(args.host, args.port, target, args.duration, args.connections, args.processes)
+        print(f"{target:>28} {rps:>9.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест base-http-server.py")
+    parser.add_argument("--modes", nargs="*", choices=["dev", "waitress", "gunicorn"],
+                        help="режимы сервера для сравнения; без них нагружается уже запущенный сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--targets", nargs="+", default=TARGETS, help='маршруты в виде "GET /path"')
+    parser.add_argument("--connections", type=int, default=16, help="одновременных соединений")
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1), help="процессов клиента")
+    parser.add_argument("--duration", type=float, default=5, help="секунд нагрузки на каждый маршрут")
+    parser.add_argument("--workers", type=int, default=4, help="передается серверу")
+    parser.add_argument("--threads", type=int, default=8, help="передается серверу")
+    parser.add_argument("--batch-records", type=int, help="вместо маршрутов сравнить загрузку стольких записей")
+    parser.add_argument("--batch-size", type=int, default=1000, help="записей в одном пакетном запросе")
+    args = parser.parse_args()
+
+    def run(mode):
+        if args.batch_records:
+            print(f"режим {mode}: {args.batch_records} записей")
+            benchmark_batch(args.host, args.port, args.batch_records, args.batch_size)
+        else:
+            report(mode, args)
+
+    if not args.modes:
+        run(f"{args.host}:{args.port}")
+    for mode in args.modes or []:
+        server = start_server(mode, args)
+        try:
+            run(mode)
+        finally:
+            stop_server(server)
@@ -0,0 +1,27 @@
+# Деление файла на диапазоны байт по границам строк для параллельного поиска в нескольких процессах.
+# Общий модуль для regexp-lutz.py и 4-1.py: каждый процесс получает (start, end) и читает свой диапазон через mmap
+import mmap
+import os
+
+def split_ranges(filename, parts):
+    # Делит файл на parts диапазонов байт (start, end), каждая граница сдвигается вперед до начала следующей строки,
+    # поэтому ни одна строка не разрезается, а граница по \n не попадает внутрь многобайтового символа UTF-8
+    size = os.path.getsize(filename)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, parts):
+            newline = mm.find(b'\n', max(size * k // parts, bounds[-1] + 1) - 1)
+            if newline == -1 or newline + 1 >= size:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def read_range(filename, start, end):
+    # Текст диапазона [start, end): файл отображается через mmap, копируются и декодируются только эти байты.
+    # Процессу нужна память под диапазон в байтах и в str (до 4 раз больше), но не под весь файл
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[start:end].decode('utf-8')